@@ -10,6 +10,6 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 import os
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangogramm.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangogramm.asgi_settings')
 
 application = get_asgi_application()
@@ -0,0 +1,7 @@
+from djangogramm.production_settings import *
+
+
+ROOT_URLCONF = 'djangogramm.asgi_urls'
+ASGI_APPLICATION = 'djangogramm.asgi.application'
+
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware != 'debug_toolbar.middleware.DebugToolbarMiddleware']
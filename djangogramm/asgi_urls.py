@@ -0,0 +1,14 @@
+from django.contrib.admin import site
+from django.urls import path, include
+from djangogramm.settings import DEBUG
+
+
+urlpatterns = [
+    path('admin/', site.urls),
+    path('', include('feed.async_urls')),
+    path('users/', include('users.urls')),
+    path('accounts/', include('allauth.urls'))
+]
+
+if DEBUG:
+    urlpatterns = [path("__debug__/", include("debug_toolbar.urls"))] + urlpatterns
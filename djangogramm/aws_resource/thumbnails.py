@@ -0,0 +1,164 @@
+from io import BytesIO
+import os
+import shutil
+from tempfile import SpooledTemporaryFile
+from PIL import Image
+
+IMAGE_THUMBNAIL_SIZE = (600, 800)
+AVATAR_THUMBNAIL_SIZE = (100, 100)
+IMAGE_BACKGROUND_COLOR = (0, 0, 0)
+WEBHOOK_BATCH_SIZE = 500
+MAX_IMAGE_PIXELS = 64_000_000
+DECODE_REDUCING_GAP = 2
+SPOOL_MAX_SIZE = 1024 * 1024
+REDUCIBLE_MODES = ('RGB', 'RGBA', 'L', 'LA', 'CMYK')
+SPOOL_CHUNK_SIZE = 64 * 1024
+
+IMAGE_RENDITIONS = {
+    'feed': (600, 800),
+    'mobile': (300, 400),
+}
+AVATAR_RENDITIONS = {
+    'avatar_32': (32, 32),
+    'avatar_64': (64, 64),
+    'avatar_100': (100, 100),
+}
+RENDITION_SIZES = IMAGE_RENDITIONS | AVATAR_RENDITIONS
+
+Image.init()
+FORMAT_OPTIONS = {
+    'webp': {'quality': 75, 'method': 6},
+    'avif': {'quality': 60},
+}
+ALTERNATE_FORMATS = tuple(image_format for image_format in ('avif', 'webp') if image_format.upper() in Image.SAVE)
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def spool(stream) -> SpooledTemporaryFile:
+    spooled = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    shutil.copyfileobj(stream, spooled, SPOOL_CHUNK_SIZE)
+    spooled.seek(0)
+    return spooled
+
+
+def open_image(source, size: tuple = None) -> Image:
+    img = Image.open(source)
+    width, height = img.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ImageTooLarge(f'Image of {width}x{height} pixels exceeds the limit of {MAX_IMAGE_PIXELS} pixels')
+    if size is None:
+        return img
+
+    ratio = min(size[0] / width, size[1] / height, 1)
+    decode_size = (max(1, round(width * ratio * DECODE_REDUCING_GAP)),
+                   max(1, round(height * ratio * DECODE_REDUCING_GAP)))
+    img.draft(None, decode_size)
+    factor = min(img.size[0] // decode_size[0], img.size[1] // decode_size[1])
+    if factor > 1 and img.mode in REDUCIBLE_MODES:
+        img = img.reduce(factor)
+    return img
+
+
+def convert_mode(img: Image) -> Image:
+    if img.mode in ('RGB', 'RGBA'):
+        return img
+    return img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+
+
+def image_handler(img: Image, size: tuple = IMAGE_THUMBNAIL_SIZE) -> Image:
+    width_actual, height_actual = img.size
+    width_target, height_target = size
+
+    if width_actual > width_target or height_actual > height_target:
+        img.thumbnail(size)
+    width_actual, height_actual = img.size
+    result = Image.new(img.mode, size, IMAGE_BACKGROUND_COLOR)
+    if width_actual == width_target and height_actual < height_target:
+        result.paste(img, (0, (height_target - height_actual) // 2))
+        return result
+    elif width_actual < width_target and height_actual == height_target:
+        result.paste(img, ((width_target - width_actual) // 2, 0))
+        return result
+    elif width_actual < width_target and height_actual < height_target:
+        result.paste(img, ((width_target - width_actual) // 2, (height_target - height_actual) // 2))
+        return result
+    else:
+        return img
+
+
+def avatar_handler(img: Image, size: tuple = AVATAR_THUMBNAIL_SIZE) -> Image:
+    width_actual, height_actual = img.size
+    width_target, height_target = size
+
+    if width_actual > width_target or height_actual > height_target:
+        img.thumbnail(size)
+        return img
+    else:
+        return img
+
+
+def get_image_format(image: Image) -> str:
+    return 'png' if image.mode == "RGBA" else 'jpeg'
+
+
+def image_to_bytes(image: Image, image_format: str = None) -> BytesIO:
+    output_buffer = BytesIO()
+    image_format = image_format or get_image_format(image)
+    image.save(output_buffer, format=image_format, **FORMAT_OPTIONS.get(image_format, {}))
+    output_buffer.seek(0)
+    return output_buffer
+
+
+def get_avatar_thumbnail_key(source_key: str) -> str:
+    file_name = os.path.basename(source_key)
+    return 'thumbnails/avatars/' + file_name
+
+
+def get_image_thumbnail_key(source_key: str) -> str:
+    file_name = os.path.basename(source_key)
+    return 'thumbnails/images/' + file_name
+
+
+def is_avatar(source_key: str) -> bool:
+    return source_key.startswith('avatars/')
+
+
+def get_rendition_key(source_key: str, rendition: str, image_format: str) -> str:
+    file_name = os.path.splitext(os.path.basename(source_key))[0]
+    folder = 'avatars' if is_avatar(source_key) else 'images'
+    return f'thumbnails/{folder}/{rendition}/{file_name}.{image_format}'
+
+
+def make_renditions(data: bytes, avatar: bool, reduced: bool = True, formats: tuple = ()) -> dict:
+    handler, renditions = (avatar_handler, AVATAR_RENDITIONS) if avatar else (image_handler, IMAGE_RENDITIONS)
+    largest = (max(width for width, _ in renditions.values()), max(height for _, height in renditions.values()))
+    original = convert_mode(open_image(BytesIO(data), size=largest if reduced else None))
+
+    result = {}
+    for rendition, size in renditions.items():
+        image = handler(original.copy(), size)
+        result[rendition] = (image_to_bytes(image).getvalue(), get_image_format(image))
+        for image_format in formats:
+            result.setdefault(image_format, {})[rendition] = (image_to_bytes(image, image_format).getvalue(),
+                                                              image_format)
+    return result
+
+
+class ThumbnailBatcher:
+    def __init__(self, send, batch_size: int = WEBHOOK_BATCH_SIZE):
+        self.send = send
+        self.batch_size = batch_size
+        self.operations = []
+
+    def add(self, original: str, thumbnail: str) -> None:
+        self.operations.append({'original': original, 'thumbnail': thumbnail})
+        if len(self.operations) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.operations:
+            operations, self.operations = self.operations, []
+            self.send(operations)
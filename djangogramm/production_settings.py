@@ -0,0 +1,33 @@
+from tempfile import gettempdir
+from djangogramm.settings import *
+
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 20000,
+    'temp_store': 'MEMORY',
+}
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'djangogramm.sqlite_backend',
+        'NAME': BASE_DIR / getenv('DATABASE_NAME'),
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+        },
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': getenv('CACHE_DIR') or f'{gettempdir()}/djangogramm_cache',
+    }
+}
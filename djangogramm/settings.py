@@ -61,7 +61,7 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "debug_toolbar.middleware.DebugToolbarMiddleware",
@@ -100,6 +100,20 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+USER_CACHE_TIMEOUT = 300
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -168,7 +182,35 @@ PASSWORD_RESET_LINK_LIFETIME_IN_WEEKS = 1
 
 POSTS_PER_PAGE = 5
 
+TIMELINE_FANOUT_MAX_FOLLOWERS = 10000
+TIMELINE_FANOUT_RESUME_FOLLOWERS = 8000
+TIMELINE_BATCH_SIZE = 1000
+
+TRENDING_TAGS_HALF_LIFE_HOURS = 24
+TRENDING_TAGS_SIZE = 10
+
+IMAGE_UPLOAD_WORKERS = 5
+
+ASYNC_CONCURRENT_READS = True
+ASYNC_READ_WORKERS = 16
+
+EVENT_RELAY_ADDRESS = getenv('EVENT_RELAY_ADDRESS')
+EVENT_RELAY_RETRY_SECONDS = 1
+EVENT_RELAY_QUEUE_SIZE = 1000
+EVENT_RELAY_DRAIN_SECONDS = 1
+EVENT_RELAY_BUFFER_BYTES = 1024 * 1024
+EVENT_COALESCE_SECONDS = 1
+EVENT_KEEPALIVE_SECONDS = 15
+EVENT_STREAM_SECONDS = 300
+EVENT_RETRY_MILLISECONDS = 1000
+EVENT_MAX_POSTS = 50
+
+LOCAL_THUMBNAILS = getenv('LOCAL_THUMBNAILS') == 'True'
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_BACKGROUND = True
+
 AWS_WEBHOOK_TOKEN = getenv('AWS_WEBHOOK_TOKEN')
+THUMBNAIL_WEBHOOK_BATCH_SIZE = 500
 
 AWS_ACCESS_KEY_ID = getenv('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = getenv('AWS_SECRET_ACCESS_KEY')
@@ -0,0 +1,34 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def init_command(self) -> str:
+        return self.settings_dict['OPTIONS'].get('init_command', '')
+
+    @property
+    def transaction_mode(self) -> str:
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(f"transaction_mode must be one of {', '.join(TRANSACTION_MODES)}")
+        return mode.upper() if mode else None
+
+    def get_connection_params(self) -> dict:
+        kwargs = super().get_connection_params()
+        kwargs.pop('init_command', None)
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for statement in self.init_command.split(';'):
+            if statement.strip():
+                conn.execute(statement)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}' if self.transaction_mode else 'BEGIN')
@@ -10,6 +10,15 @@ STORAGES = {
     },
 }
 
+ASYNC_CONCURRENT_READS = False
+THUMBNAIL_BACKGROUND = False
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
+
 SOCIALACCOUNT_PROVIDERS = {
     'google': {
         'EMAIL_AUTHENTICATION': True,
@@ -0,0 +1,19 @@
+from django.urls import path
+from django.contrib.auth.decorators import login_required
+from feed.views import TagFeed, Search, CreatePost, AWSLambdaWebhook, FeedApi, ProfileApi, PostApi
+from feed.async_views import AsyncFeed, AsyncProfile, AsyncLike, AsyncFollow, AsyncEvents
+
+urlpatterns = [
+    path('', AsyncFeed.as_view(), name="feed"),
+    path('tags/<str:tag>/', TagFeed.as_view(), name="tag"),
+    path('search/', Search.as_view(), name="search"),
+    path('profile/<int:user_id>', AsyncProfile.as_view(), name="profile"),
+    path('create_post/', login_required(CreatePost.as_view()), name="create_post"),
+    path('like/', AsyncLike.as_view(), name="like"),
+    path('follow/', AsyncFollow.as_view(), name="follow"),
+    path('events/', AsyncEvents.as_view(), name="events"),
+    path('webhook/', AWSLambdaWebhook.as_view(), name="webhook"),
+    path('api/feed', FeedApi.as_view(), name="api_feed"),
+    path('api/profile/<int:user_id>', ProfileApi.as_view(), name="api_profile"),
+    path('api/posts/<int:post_id>', PostApi.as_view(), name="api_post"),
+]
@@ -0,0 +1,175 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+from typing import Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections
+from django.http import JsonResponse, Http404, StreamingHttpResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views import View
+from feed.events import Subscription, get_broker, format_event
+from feed.models import Post
+from feed.services import PostService, LikeService, AuthorFollowerService, EventService
+from feed.views import get_feed_state, get_profile_state, get_feed_etag, get_profile_etag
+from users.services import UserService
+
+
+@lru_cache(maxsize=None)
+def get_read_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=settings.ASYNC_READ_WORKERS, thread_name_prefix='async_read')
+
+
+async def run_read(func, *args, **kwargs):
+    if not settings.ASYNC_CONCURRENT_READS:
+        return await sync_to_async(func)(*args, **kwargs)
+
+    def read():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return await sync_to_async(read, thread_sensitive=False, executor=get_read_executor())()
+
+
+async def get_user_id(request) -> Optional[int]:
+    return await run_read(lambda: request.user.pk)
+
+
+def async_condition(etag_func):
+    def decorator(method):
+        @wraps(method)
+        async def inner(self, request, *args, **kwargs):
+            etag = quote_etag(await run_read(etag_func, request, *args, **kwargs))
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await method(self, request, *args, **kwargs)
+                if response.status_code == 200:
+                    response.headers.setdefault('ETag', etag)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+    return decorator
+
+
+class AsyncLoginRequiredMixin:
+    async def dispatch(self, request, *args, **kwargs):
+        if not await run_read(lambda: request.user.is_authenticated):
+            return redirect_to_login(request.get_full_path())
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncFeed(View):
+    @async_condition(get_feed_etag)
+    async def get(self, request):
+        user_id = await get_user_id(request)
+        state = await run_read(get_feed_state, request)
+        page_obj = await run_read(PostService.load_page, state['page'])
+        context = {
+            'page_obj': page_obj,
+            'liked_post_ids': await run_read(LikeService.get_liked_post_ids, user_id=user_id, posts=page_obj),
+            'trending_tags': state['trending']
+                   }
+        return await run_read(render, request, 'feed/feed.html', context=context)
+
+
+class AsyncProfile(AsyncLoginRequiredMixin, View):
+    @async_condition(get_profile_etag)
+    async def get(self, request, user_id):
+        state = await run_read(get_profile_state, request, user_id)
+        stats, page_obj = await asyncio.gather(
+            run_read(AuthorFollowerService.get_all_stats, author_id=user_id, follower_id=request.user.pk),
+            run_read(PostService.load_page, state['page']))
+        followers_data = {
+                'followers': stats['followers'],
+                'followees': stats['followees'],
+                'is_following': stats['is_following']
+                       }
+        context = {
+            'page_obj': page_obj if page_obj else await run_read(UserService.get, user_id=user_id),
+            'author_id': user_id,
+            'posts_amount': stats['posts'],
+            'liked_post_ids': await run_read(LikeService.get_liked_post_ids, user_id=request.user.pk, posts=page_obj)
+                   }
+        return await run_read(render, request, 'feed/profile.html', context=context | followers_data)
+
+
+class AsyncLike(AsyncLoginRequiredMixin, View):
+    async def post(self, request):
+        try:
+            post_id = int(request.POST['post_id'])
+        except (KeyError, ValueError):
+            return JsonResponse(status=400, data={'message': "Post id is invalid"})
+        try:
+            liked, like_count = await sync_to_async(LikeService.toggle)(post_id=post_id, user_id=request.user.pk)
+        except Post.DoesNotExist:
+            raise Http404("Post was not found")
+        return JsonResponse({'post_id': post_id, 'liked': liked, 'like_count': like_count})
+
+
+class AsyncFollow(AsyncLoginRequiredMixin, View):
+    @staticmethod
+    def toggle(author_id: int, follower_id: int) -> bool:
+        if AuthorFollowerService.is_following(author_id=author_id, follower_id=follower_id):
+            AuthorFollowerService.unfollow(author_id=author_id, follower_id=follower_id)
+            return False
+        AuthorFollowerService.follow(author_id=author_id, follower_id=follower_id)
+        return True
+
+    @staticmethod
+    def render_fragments(request, author_id: int, is_following: bool, followers: int) -> dict:
+        button_context = {'author_id': author_id, 'is_following': is_following}
+        counter_context = {'followers': followers}
+        return {
+            'button_html': render_to_string('feed/ajax_follow_button.html', context=button_context, request=request),
+            'counter_html': render_to_string('feed/ajax_followers_counter.html', context=counter_context,
+                                             request=request)
+        }
+
+    async def post(self, request):
+        author_id = int(request.POST['author_id'])
+        follower_id = request.user.pk
+        if follower_id != author_id:
+            is_following = await sync_to_async(self.toggle)(author_id=author_id, follower_id=follower_id)
+            followers = await run_read(AuthorFollowerService.get_followers_stats, author_id)
+            return JsonResponse(await run_read(self.render_fragments, request, author_id=author_id,
+                                               is_following=is_following, followers=followers))
+
+        return await run_read(render, request, 'message.html',
+                              {'message': "Error occured. Following your own profile is not allowed"})
+
+
+class AsyncEvents(AsyncLoginRequiredMixin, View):
+    @staticmethod
+    def parse_post_ids(value: str) -> list:
+        return [int(post_id) for post_id in value.split(',') if post_id.isdigit()][:settings.EVENT_MAX_POSTS]
+
+    @staticmethod
+    async def stream(subscription: Subscription):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.EVENT_STREAM_SECONDS
+        try:
+            yield f'retry: {settings.EVENT_RETRY_MILLISECONDS}\n: connected\n\n'
+            while (remaining := deadline - loop.time()) > 0:
+                events = await subscription.get(timeout=min(settings.EVENT_KEEPALIVE_SECONDS, remaining))
+                if not events:
+                    yield ': keepalive\n\n'
+                    continue
+                yield ''.join(format_event(event) for event in events)
+                await asyncio.sleep(settings.EVENT_COALESCE_SECONDS)
+        finally:
+            subscription.close()
+
+    async def get(self, request):
+        channels = await run_read(EventService.get_channels, user_id=request.user.pk,
+                                  post_ids=self.parse_post_ids(request.GET.get('posts', '')),
+                                  timeline=request.GET.get('timeline') == '1')
+        response = StreamingHttpResponse(self.stream(get_broker().subscribe(channels)),
+                                         content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import queue
+import socket
+import threading
+from functools import lru_cache
+from django.conf import settings
+
+LIKE = 'like'
+NEW_POSTS = 'new_posts'
+
+
+def get_post_channel(post_id: int) -> str:
+    return f'post:{post_id}'
+
+
+def get_author_channel(author_id: int) -> str:
+    return f'author:{author_id}'
+
+
+def format_event(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def parse_address(address: str) -> tuple:
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+class Subscription:
+    def __init__(self, broker, channels: list):
+        self.broker = broker
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.pending = {}
+        self.ready = asyncio.Event()
+
+    def put(self, event: dict) -> None:
+        if event['type'] == LIKE:
+            key = (LIKE, event['post_id'])
+            if key in self.pending:
+                self.pending[key]['delta'] += event['delta']
+                self.pending[key]['like_count'] = event['like_count']
+            else:
+                self.pending[key] = dict(event)
+        elif event['type'] == NEW_POSTS:
+            key = (NEW_POSTS, None)
+            count = self.pending[key]['count'] if key in self.pending else 0
+            self.pending[key] = {'type': NEW_POSTS, 'count': count + 1, 'post_id': event['post_id']}
+        self.ready.set()
+
+    async def get(self, timeout: float) -> list:
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        events, self.pending = list(self.pending.values()), {}
+        self.ready.clear()
+        return events
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    def __init__(self):
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, channels: list) -> Subscription:
+        subscription = Subscription(self, channels)
+        with self.lock:
+            for channel in channels:
+                self.subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.subscriptions[channel]
+
+    def publish(self, channel: str, event: dict) -> None:
+        self.deliver(channel, event)
+
+    def deliver(self, channel: str, event: dict) -> None:
+        with self.lock:
+            subscribers = list(self.subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                self.unsubscribe(subscription)
+
+
+class RelayBroker(EventBroker):
+    def __init__(self, address: str):
+        super().__init__()
+        self.address = parse_address(address)
+        self.connection = None
+        self.outbox = queue.Queue(maxsize=settings.EVENT_RELAY_QUEUE_SIZE)
+        self.sender = None
+        self.sender_lock = threading.Lock()
+        self.listeners = {}
+
+    def subscribe(self, channels: list) -> Subscription:
+        subscription = super().subscribe(channels)
+        listener = self.listeners.get(subscription.loop)
+        if listener is None or listener.done():
+            self.listeners[subscription.loop] = subscription.loop.create_task(self.listen())
+        return subscription
+
+    def publish(self, channel: str, event: dict) -> None:
+        try:
+            self.outbox.put_nowait((channel, event))
+        except queue.Full:
+            self.deliver(channel, event)
+            return
+        if self.sender is None:
+            with self.sender_lock:
+                if self.sender is None:
+                    self.sender = threading.Thread(target=self.send_all, name='event_relay', daemon=True)
+                    self.sender.start()
+
+    def send_all(self) -> None:
+        while True:
+            self.send(*self.outbox.get())
+
+    def send(self, channel: str, event: dict) -> None:
+        message = (json.dumps({'channel': channel, 'event': event}) + '\n').encode()
+        for _ in range(2):
+            try:
+                if self.connection is None:
+                    self.connection = socket.create_connection(self.address, timeout=1)
+                self.connection.sendall(message)
+                return
+            except OSError:
+                if self.connection is not None:
+                    self.connection.close()
+                self.connection = None
+        self.deliver(channel, event)
+
+    async def listen(self) -> None:
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(*self.address)
+            except OSError:
+                await asyncio.sleep(settings.EVENT_RELAY_RETRY_SECONDS)
+                continue
+            try:
+                while line := await reader.readline():
+                    message = json.loads(line)
+                    self.deliver(message['channel'], message['event'])
+            except (OSError, ValueError):
+                pass
+            finally:
+                writer.close()
+            await asyncio.sleep(settings.EVENT_RELAY_RETRY_SECONDS)
+
+
+@lru_cache(maxsize=None)
+def get_broker() -> EventBroker:
+    return RelayBroker(settings.EVENT_RELAY_ADDRESS) if settings.EVENT_RELAY_ADDRESS else EventBroker()
+
+
+async def start_relay(host: str, port: int) -> asyncio.AbstractServer:
+    writers = set()
+
+    def drop(writer: asyncio.StreamWriter) -> None:
+        writers.discard(writer)
+        writer.close()
+
+    async def forward(peer: asyncio.StreamWriter, line: bytes) -> None:
+        if peer.transport.get_write_buffer_size() > settings.EVENT_RELAY_BUFFER_BYTES:
+            drop(peer)
+            return
+        peer.write(line)
+        try:
+            await asyncio.wait_for(peer.drain(), settings.EVENT_RELAY_DRAIN_SECONDS)
+        except (OSError, asyncio.TimeoutError):
+            drop(peer)
+
+    async def relay(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        writers.add(writer)
+        try:
+            while line := await reader.readline():
+                await asyncio.gather(*(forward(peer, line) for peer in list(writers) if peer is not writer))
+        except (OSError, ValueError):
+            pass
+        finally:
+            drop(writer)
+
+    return await asyncio.start_server(relay, host, port)
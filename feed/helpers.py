@@ -1,12 +1,135 @@
-from django.core.paginator import Paginator, Page
+import json
+from hashlib import md5
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from binascii import Error as BinasciiError
+from datetime import datetime
+from typing import Optional
+from django.db.models import Q
 from django.db.models.query import QuerySet
 from djangogramm.settings import POSTS_PER_PAGE
 
+NEXT = 'n'
+PREVIOUS = 'p'
+OFFSET = 'o'
 
-def get_paginator(posts: QuerySet) -> Paginator:
-    return Paginator(posts, POSTS_PER_PAGE)
 
+class CursorPage:
+    def __init__(self, object_list: list, next_cursor: str = None, previous_cursor: str = None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
 
-def get_page_obj(posts: QuerySet, page_number: str) -> Page:
-    p = get_paginator(posts)
-    return p.get_page(page_number)
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+
+def encode_cursor(*values) -> str:
+    data = json.dumps(values, separators=(',', ':')).encode()
+    return urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Optional[list]:
+    if not cursor:
+        return None
+    try:
+        data = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(data)
+    except (ValueError, BinasciiError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def decode_position(cursor: str) -> Optional[tuple]:
+    values = decode_cursor(cursor)
+    try:
+        direction, created, pk = values
+        if direction not in (NEXT, PREVIOUS):
+            return None
+        return direction, datetime.fromisoformat(created), int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def decode_offset(cursor: str) -> int:
+    values = decode_cursor(cursor)
+    try:
+        marker, offset = values
+        return max(0, int(offset)) if marker == OFFSET else 0
+    except (ValueError, TypeError):
+        return 0
+
+
+def get_value(obj, field: str):
+    return obj[field] if isinstance(obj, dict) else getattr(obj, field)
+
+
+def get_cursor_page(posts: QuerySet, cursor: str = None, created_field: str = 'datetime_created',
+                    id_field: str = 'id', per_page: int = POSTS_PER_PAGE) -> CursorPage:
+    position = decode_position(cursor)
+
+    if position is None:
+        direction = NEXT
+        posts = posts.order_by(f'-{created_field}', f'-{id_field}')
+    else:
+        direction, created, pk = position
+        if direction == PREVIOUS:
+            posts = (posts.filter(Q(**{f'{created_field}__gt': created})
+                                  | Q(**{created_field: created, f'{id_field}__gt': pk}))
+                     .order_by(created_field, id_field))
+        else:
+            posts = (posts.filter(Q(**{f'{created_field}__lt': created})
+                                  | Q(**{created_field: created, f'{id_field}__lt': pk}))
+                     .order_by(f'-{created_field}', f'-{id_field}'))
+
+    rows = list(posts[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if direction == PREVIOUS:
+        rows.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, position is not None
+
+    def make_cursor(cursor_direction: str, obj) -> str:
+        return encode_cursor(cursor_direction, get_value(obj, created_field).isoformat(), get_value(obj, id_field))
+
+    return CursorPage(
+        object_list=rows,
+        next_cursor=make_cursor(NEXT, rows[-1]) if rows and has_next else None,
+        previous_cursor=make_cursor(PREVIOUS, rows[0]) if rows and has_previous else None
+    )
+
+
+def get_offset_page(object_list: list, offset: int, has_next: bool, per_page: int = POSTS_PER_PAGE) -> CursorPage:
+    return CursorPage(
+        object_list=object_list,
+        next_cursor=encode_cursor(OFFSET, offset + per_page) if has_next else None,
+        previous_cursor=encode_cursor(OFFSET, max(0, offset - per_page)) if offset > 0 else None
+    )
+
+
+def make_etag(*parts) -> str:
+    return md5(json.dumps(parts, default=str, separators=(',', ':')).encode()).hexdigest()
+
+
+def get_id_batches(queryset: QuerySet, batch_size: int):
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return
+        last_id = ids[-1]
+        yield ids
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest.mock import patch
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+from django.db.backends.utils import CursorWrapper
+from django.shortcuts import reverse
+from django.test import Client, AsyncClient, override_settings
+from djangogramm.asgi_settings import ROOT_URLCONF as ASGI_URLCONF, MIDDLEWARE as ASGI_MIDDLEWARE
+from feed.management.commands.benchmark_views import percentile
+from feed.seeding import seed_dataset
+from users.models import CustomUser
+from users.services import UserService
+
+MODE_SETTINGS = {
+    'wsgi': {},
+    'asgi': {'ROOT_URLCONF': ASGI_URLCONF, 'MIDDLEWARE': ASGI_MIDDLEWARE},
+}
+
+
+@contextmanager
+def query_latency(seconds: float):
+    execute = CursorWrapper._execute
+
+    def slow_execute(self, sql, params, *ignored_wrapper_args):
+        time.sleep(seconds)
+        return execute(self, sql, params, *ignored_wrapper_args)
+
+    with patch.object(CursorWrapper, '_execute', slow_execute):
+        yield
+
+
+class Command(BaseCommand):
+    help = ('Seeds a synthetic dataset and requests Feed and Profile through the WSGI handler from a thread pool and '
+            'through the ASGI handler from a single event loop, with simulated latency added to every query. '
+            'Reports throughput and latency percentiles as JSON. The seeded rows are deleted afterwards')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=list(MODE_SETTINGS), default=list(MODE_SETTINGS))
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--followees', type=float, default=20, help='Mean followees per user')
+        parser.add_argument('--posts', type=float, default=5, help='Mean posts per user')
+        parser.add_argument('--likes', type=float, default=5, help='Mean likes per post')
+        parser.add_argument('--requests', type=int, default=64, help='Requests per mode')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight on the ASGI path')
+        parser.add_argument('--wsgi-threads', type=int, default=4, help='Worker threads on the WSGI path')
+        parser.add_argument('--latency', type=float, default=50, help='Simulated storage latency per query, ms')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        dataset = seed_dataset(users=options['users'], followees_per_user=options['followees'],
+                               posts_per_user=options['posts'], likes_per_post=options['likes'], tags=0,
+                               random_seed=options['seed'])
+        user_ids = dataset['user_ids']
+        try:
+            login = Client()
+            login.force_login(UserService.get(user_id=rnd.choice(user_ids)))
+            paths = [reverse('feed') if number % 2 else reverse('profile', kwargs={'user_id': rnd.choice(user_ids)})
+                     for number in range(options['requests'])]
+
+            report = {'parameters': {key: options[key] for key in
+                                     ('users', 'requests', 'concurrency', 'wsgi_threads', 'latency', 'seed')},
+                      'modes': {}}
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']), \
+                    query_latency(options['latency'] / 1000):
+                for mode in options['modes']:
+                    with override_settings(**MODE_SETTINGS[mode]):
+                        started = time.perf_counter()
+                        if mode == 'wsgi':
+                            results = self.run_wsgi(paths, login.cookies, options['wsgi_threads'])
+                        else:
+                            results = async_to_sync(self.run_asgi)(paths, login.cookies, options['concurrency'])
+                        report['modes'][mode] = self.summarize(results, time.perf_counter() - started)
+        finally:
+            for start in range(0, len(user_ids), 500):
+                CustomUser.objects.filter(pk__in=user_ids[start:start + 500]).delete()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def run_wsgi(paths: list, cookies, threads: int) -> list:
+        local = threading.local()
+
+        def request(path: str) -> tuple:
+            if not hasattr(local, 'client'):
+                local.client = Client()
+                local.client.cookies.update(cookies)
+            started = time.perf_counter()
+            status = local.client.get(path).status_code
+            return status, (time.perf_counter() - started) * 1000
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return list(executor.map(request, paths))
+
+    @staticmethod
+    async def run_asgi(paths: list, cookies, concurrency: int) -> list:
+        client = AsyncClient()
+        client.cookies.update(cookies)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request(path: str) -> tuple:
+            async with semaphore:
+                started = time.perf_counter()
+                status = (await client.get(path)).status_code
+                return status, (time.perf_counter() - started) * 1000
+
+        return await asyncio.gather(*(request(path) for path in paths))
+
+    @staticmethod
+    def summarize(results: list, elapsed: float) -> dict:
+        latencies = [latency for _, latency in results]
+        return {
+            'errors': sum(status != 200 for status, _ in results),
+            'requests_per_second': round(len(results) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+        }
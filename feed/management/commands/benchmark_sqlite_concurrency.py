@@ -0,0 +1,125 @@
+import json
+import os
+import random
+import threading
+import time
+from tempfile import TemporaryDirectory
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction, OperationalError
+from django.db.utils import DEFAULT_DB_ALIAS
+from djangogramm.production_settings import DATABASES as PRODUCTION_DATABASES
+from feed.management.commands.benchmark_views import percentile
+
+PROFILES = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3'},
+    'production': {key: value for key, value in PRODUCTION_DATABASES[DEFAULT_DB_ALIAS].items() if key != 'NAME'},
+}
+
+
+class Command(BaseCommand):
+    help = ('Runs a mixed read/write workload from several threads against a scratch SQLite file with the '
+            'default and production database settings, and reports throughput, latencies and lock errors as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', choices=list(PROFILES), default=list(PROFILES))
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5, help='Seconds per profile')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Share of operations that like a post')
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        report = {'parameters': {key: options[key] for key in
+                                 ('threads', 'duration', 'write_ratio', 'posts', 'users', 'seed')},
+                  'profiles': {}}
+        with TemporaryDirectory() as directory:
+            for profile in options['profiles']:
+                alias = f'benchmark_{profile}'
+                connections.settings[alias] = connections.configure_settings({
+                    DEFAULT_DB_ALIAS: {}, alias: {**PROFILES[profile], 'NAME': os.path.join(directory, alias)}})[alias]
+                try:
+                    self.create_schema(alias, options)
+                    report['profiles'][profile] = self.run_profile(alias, options)
+                finally:
+                    connections[alias].close()
+                    del connections[alias]
+                    del connections.settings[alias]
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def create_schema(alias: str, options: dict) -> None:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('CREATE TABLE post (id INTEGER PRIMARY KEY, body TEXT NOT NULL, '
+                           'like_count INTEGER NOT NULL DEFAULT 0, created REAL NOT NULL)')
+            cursor.execute('CREATE INDEX post_created_idx ON post (created DESC, id DESC)')
+            cursor.execute('CREATE TABLE post_like (post_id INTEGER NOT NULL, user_id INTEGER NOT NULL, '
+                           'PRIMARY KEY (post_id, user_id))')
+            cursor.executemany('INSERT INTO post (body, created) VALUES (%s, %s)',
+                               [(f'Post {number}', number) for number in range(options['posts'])])
+
+    def run_profile(self, alias: str, options: dict) -> dict:
+        results = []
+        deadline = time.perf_counter() + options['duration']
+        workers = [threading.Thread(target=self.work, args=(alias, options, options['seed'] + number, deadline,
+                                                            results))
+                   for number in range(options['threads'])]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        reads = [latency for kind, latency, failed in results if kind == 'read' and not failed]
+        writes = [latency for kind, latency, failed in results if kind == 'write' and not failed]
+        return {
+            'reads': len(reads),
+            'writes': len(writes),
+            'errors': sum(failed for _, _, failed in results),
+            'ops_per_second': round((len(reads) + len(writes)) / options['duration'], 1),
+            'read_p95_ms': round(percentile(reads, 95), 3) if reads else None,
+            'write_p95_ms': round(percentile(writes, 95), 3) if writes else None,
+        }
+
+    @staticmethod
+    def work(alias: str, options: dict, seed: int, deadline: float, results: list) -> None:
+        rnd = random.Random(seed)
+        connection = connections[alias]
+        measured = []
+        try:
+            while time.perf_counter() < deadline:
+                write = rnd.random() < options['write_ratio']
+                started = time.perf_counter()
+                try:
+                    if write:
+                        Command.toggle_like(alias, post_id=rnd.randint(1, options['posts']),
+                                            user_id=rnd.randint(1, options['users']))
+                    else:
+                        with connection.cursor() as cursor:
+                            cursor.execute('SELECT id, body, like_count FROM post ORDER BY created DESC, id DESC '
+                                           'LIMIT 10 OFFSET %s', [rnd.randrange(options['posts'])])
+                            cursor.fetchall()
+                    failed = False
+                except OperationalError:
+                    failed = True
+                measured.append(('write' if write else 'read', (time.perf_counter() - started) * 1000, failed))
+        finally:
+            connection.close()
+            results.extend(measured)
+
+    @staticmethod
+    def toggle_like(alias: str, post_id: int, user_id: int) -> None:
+        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1 FROM post_like WHERE post_id = %s AND user_id = %s', [post_id, user_id])
+            if cursor.fetchone():
+                cursor.execute('DELETE FROM post_like WHERE post_id = %s AND user_id = %s', [post_id, user_id])
+                cursor.execute('UPDATE post SET like_count = like_count - 1 WHERE id = %s', [post_id])
+            else:
+                cursor.execute('INSERT INTO post_like (post_id, user_id) VALUES (%s, %s)', [post_id, user_id])
+                cursor.execute('UPDATE post SET like_count = like_count + 1 WHERE id = %s', [post_id])
@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+from tempfile import TemporaryDirectory
+from PIL import Image
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+MEASURE_SCRIPT = '''
+import json, resource, sys, time
+from djangogramm.aws_resource.thumbnails import make_renditions
+
+def peak_rss_kb():
+    try:
+        with open('/proc/self/status') as status:
+            return next(int(line.split()[1]) for line in status if line.startswith('VmHWM:'))
+    except (OSError, StopIteration):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+path, avatar, reduced = sys.argv[1], sys.argv[2] == '1', sys.argv[3] == '1'
+with open(path, 'rb') as file:
+    data = file.read()
+baseline = peak_rss_kb()
+started = time.process_time()
+make_renditions(data, avatar=avatar, reduced=reduced)
+print(json.dumps({'cpu_ms': (time.process_time() - started) * 1000, 'peak_rss_kb': peak_rss_kb() - baseline}))
+'''
+
+
+class Command(BaseCommand):
+    help = ('Measures CPU time and peak RSS of making renditions with full and reduced resolution decoding, '
+            'each run in a fresh interpreter, and reports them as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', nargs='*', default=[], help='Sample images, generated when omitted')
+        parser.add_argument('--megapixels', type=int, nargs='+', default=[3, 12, 48],
+                            help='Sizes of generated JPEG samples')
+        parser.add_argument('--avatar', action='store_true', help='Make avatar renditions instead of post ones')
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        with TemporaryDirectory() as directory:
+            paths = options['images'] or [self.make_sample(directory, megapixels)
+                                          for megapixels in options['megapixels']]
+            report = [self.measure_image(path, options['avatar'], options['repeat']) for path in paths]
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def make_sample(directory: str, megapixels: int) -> str:
+        width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+        path = os.path.join(directory, f'sample_{megapixels}mp.jpeg')
+        gradient = Image.linear_gradient('L').resize((width, width * 3 // 4))
+        Image.merge('RGB', (gradient, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT),
+                            gradient.transpose(Image.Transpose.FLIP_TOP_BOTTOM))).save(path, quality=90)
+        return path
+
+    def measure_image(self, path: str, avatar: bool, repeat: int) -> dict:
+        with Image.open(path) as image:
+            result = {'image': os.path.basename(path), 'size': image.size, 'bytes': os.path.getsize(path)}
+        for mode, reduced in (('full', False), ('reduced', True)):
+            runs = [self.measure_run(path, avatar, reduced) for _ in range(repeat)]
+            result[mode] = {'cpu_ms': round(min(run['cpu_ms'] for run in runs), 1),
+                            'peak_rss_kb': min(run['peak_rss_kb'] for run in runs)}
+        return result
+
+    @staticmethod
+    def measure_run(path: str, avatar: bool, reduced: bool) -> dict:
+        output = subprocess.run([sys.executable, '-c', MEASURE_SCRIPT, path, str(int(avatar)), str(int(reduced))],
+                                cwd=settings.BASE_DIR, check=True, capture_output=True, text=True).stdout
+        return json.loads(output)
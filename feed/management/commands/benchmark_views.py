@@ -0,0 +1,106 @@
+import json
+import math
+import random
+import time
+import tracemalloc
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.shortcuts import reverse
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from feed.seeding import seed_dataset
+from users.services import UserService
+
+
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark_views',
+    }
+}
+
+
+def percentile(values: list, percent: float) -> float:
+    ordered = sorted(values)
+    index = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = ('Seeds synthetic datasets of growing size inside a rolled back transaction and reports query counts, '
+            'latency percentiles and peak memory of Feed, Profile, Like and Follow as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000],
+                            help='Number of users for each dataset')
+        parser.add_argument('--followees', type=float, default=20, help='Mean followees per user')
+        parser.add_argument('--posts', type=float, default=5, help='Mean posts per user')
+        parser.add_argument('--likes', type=float, default=10, help='Mean likes per post')
+        parser.add_argument('--tags', type=int, default=50, help='Distinct tags')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per view and dataset')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver'], CACHES=BENCHMARK_CACHES):
+            try:
+                report = {'parameters': {key: options[key] for key in
+                                         ('followees', 'posts', 'likes', 'tags', 'requests', 'seed')},
+                          'datasets': [self.run_dataset(users, options) for users in options['sizes']]}
+            finally:
+                cache.clear()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    def run_dataset(self, users: int, options: dict) -> dict:
+        rnd = random.Random(options['seed'])
+        with transaction.atomic():
+            dataset = seed_dataset(users=users, followees_per_user=options['followees'],
+                                   posts_per_user=options['posts'], likes_per_post=options['likes'],
+                                   tags=options['tags'], random_seed=options['seed'])
+            user_ids = dataset.pop('user_ids')
+            first_post_id, last_post_id = dataset.pop('first_post_id'), dataset.pop('last_post_id')
+            viewer_id = rnd.choice(user_ids)
+            authors = [user_id for user_id in user_ids if user_id != viewer_id]
+            client = Client()
+            client.force_login(UserService.get(user_id=viewer_id))
+
+            views = {
+                'feed': lambda: client.get(reverse('feed')),
+                'profile': lambda: client.get(reverse('profile', kwargs={'user_id': rnd.choice(user_ids)})),
+                'like': lambda: client.post(reverse('like'), {'post_id': rnd.randint(first_post_id, last_post_id)}),
+                'follow': lambda: client.post(reverse('follow'), {'author_id': rnd.choice(authors)}),
+            }
+            dataset['views'] = {name: self.measure(request, options['requests']) for name, request in views.items()}
+            transaction.set_rollback(True)
+        return dataset
+
+    @staticmethod
+    def measure(request, amount: int) -> dict:
+        latencies, queries = [], []
+        for _ in range(amount):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                request()
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+
+        tracemalloc.start()
+        request()
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            'queries_max': max(queries),
+            'queries_median': percentile(queries, 50),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'peak_memory_kb': round(peak_memory / 1024, 1),
+        }
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from feed.models import AuthorFollower, Image, Like, PostTag, TagTrend
+from feed.repository import PostRepository
+from users.models import CustomUser
+
+
+def get_hot_queries() -> list:
+    return [
+        ('profile posts', PostRepository.get_profile_posts(user_id=1), 'post_user_created_idx'),
+        ('all posts', PostRepository.get_all_posts(), 'post_created_idx'),
+        ('home timeline', PostRepository.get_timeline_posts(user_id=1), 'timeline_user_created_idx'),
+        ('followees', AuthorFollower.objects.filter(follower_id=1).values('author_id'), 'authorfollower_follower_idx'),
+        ('post likers', Like.objects.filter(post_id=1).values('user_id'), 'like_post_user_idx'),
+        ('tag posts', PostTag.objects.filter(tag_id=1).values('post_id'), 'posttag_tag_post_idx'),
+        ('tag timeline', PostRepository.get_tag_posts(tag_id=1), 'posttag_tag_created_idx'),
+        ('trending tags', TagTrend.objects.order_by('-score', 'tag')[:10], 'tagtrend_score_idx'),
+        ('image by path', Image.objects.filter(image='images/image.jpg'), 'feed_image_image_'),
+        ('avatar by path', CustomUser.objects.filter(avatar='avatars/avatar.jpg'), 'users_customuser_avatar_'),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Runs EXPLAIN for the hot queries and checks that each of them uses its index'
+
+    def handle(self, *args, **options):
+        failed = []
+        for name, queryset, index in get_hot_queries():
+            plan = queryset.explain()
+            if index in plan:
+                self.stdout.write(f'{name}: uses {index}')
+            else:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: {index} is not used\n{plan}'))
+        if failed:
+            raise CommandError(f'Queries not using their index: {", ".join(failed)}')
+        self.stdout.write(self.style.SUCCESS('All hot queries use their indexes'))
@@ -0,0 +1,68 @@
+import json
+import os
+from collections import Counter
+from django.core.management.base import BaseCommand
+from djangogramm.aws_resource.thumbnails import make_renditions, ALTERNATE_FORMATS
+from feed.helpers import get_id_batches
+from feed.repository import ImageRepository
+
+FALLBACK = 'fallback'
+
+
+class Command(BaseCommand):
+    help = ('Renders post image renditions of a sample corpus in JPEG/PNG and every alternate format '
+            'Pillow supports, and reports bytes per format as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', help='Use the images in this directory instead of uploaded post images')
+        parser.add_argument('--limit', type=int, default=100, help='Images in the sample')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        sizes = {image_format: Counter() for image_format in (FALLBACK, *ALTERNATE_FORMATS)}
+        images = 0
+        for data in self.get_corpus(options['directory'], options['limit']):
+            try:
+                renditions = make_renditions(data, avatar=False, formats=ALTERNATE_FORMATS)
+            except Exception:
+                continue
+            images += 1
+            for rendition, value in renditions.items():
+                if rendition in ALTERNATE_FORMATS:
+                    sizes[rendition].update({name: len(content) for name, (content, _) in value.items()})
+                else:
+                    sizes[FALLBACK][rendition] += len(value[0])
+
+        fallback_total = sum(sizes[FALLBACK].values())
+        report = {'images': images, 'formats': {}}
+        for image_format, renditions in sizes.items():
+            total = sum(renditions.values())
+            report['formats'][image_format] = {
+                'bytes': dict(renditions),
+                'total': total,
+                'ratio': round(total / fallback_total, 3) if fallback_total else None,
+            }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def get_corpus(directory: str, limit: int):
+        if directory:
+            for name in sorted(os.listdir(directory))[:limit]:
+                with open(os.path.join(directory, name), 'rb') as file:
+                    yield file.read()
+            return
+
+        storage = ImageRepository.get_storage()
+        for image_ids in get_id_batches(ImageRepository.get_without_renditions(regenerate=True), batch_size=limit):
+            for _, path, _ in ImageRepository.get_paths(image_ids):
+                if limit <= 0:
+                    return
+                limit -= 1
+                with storage.open(path) as file:
+                    yield file.read()
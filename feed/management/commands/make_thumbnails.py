@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from feed.helpers import get_id_batches
+from feed.repository import ImageRepository
+from feed.services import ThumbnailService
+from users.repository import UserRepository
+
+
+class Command(BaseCommand):
+    help = 'Renders feed, mobile and avatar renditions locally in a process pool and records them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--regenerate', action='store_true', help='Render images that already have renditions')
+
+    def handle(self, *args, **options):
+        images = avatars = 0
+        for image_ids in get_id_batches(ImageRepository.get_without_renditions(options['regenerate']),
+                                        batch_size=options['batch_size']):
+            images += ThumbnailService.make_image_renditions(image_ids)
+        for user_ids in get_id_batches(UserRepository.get_without_renditions(options['regenerate']),
+                                       batch_size=options['batch_size']):
+            avatars += ThumbnailService.make_avatar_renditions(user_ids)
+        self.stdout.write(self.style.SUCCESS(f'Renditions made for {images} images and {avatars} avatars'))
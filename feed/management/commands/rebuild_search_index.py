@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from feed.services import SearchService
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index from posts and their tags in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        indexed = SearchService.rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt, {indexed} posts indexed'))
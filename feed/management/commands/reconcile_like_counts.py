@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from feed.services import PostService
+
+
+class Command(BaseCommand):
+    help = 'Recalculates the stored Post.like_count values from the Like table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = PostService.reconcile_like_counts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Like counts reconciled, {updated} posts updated'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from feed.services import AuthorFollowerService
+
+
+class Command(BaseCommand):
+    help = 'Recalculates follower, followee and post counters in UserStats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        repaired = AuthorFollowerService.repair_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'User stats repaired, {repaired} users updated'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from feed.services import TimelineService
+from djangogramm.settings import TIMELINE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = ('Copies posts of authors pulled at read whose follower count fell to TIMELINE_FANOUT_RESUME_FOLLOWERS '
+            'into follower timelines and pushes their new posts again')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=TIMELINE_BATCH_SIZE, help='Followers per backfill batch')
+
+    def handle(self, *args, **options):
+        resumed = TimelineService.resume_fan_out(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Timeline fan-out resumed for {resumed} authors'))
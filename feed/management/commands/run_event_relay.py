@@ -0,0 +1,23 @@
+import asyncio
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from feed.events import parse_address, start_relay
+
+
+class Command(BaseCommand):
+    help = ('Runs the event relay that forwards like and new post events between server processes when '
+            'EVENT_RELAY_ADDRESS is set')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--address', default=settings.EVENT_RELAY_ADDRESS or '127.0.0.1:8765',
+                            help='host:port to listen on')
+
+    def handle(self, *args, **options):
+        host, port = parse_address(options['address'])
+        self.stdout.write(f'Relaying events on {host}:{port}')
+        asyncio.run(self.serve(host, port))
+
+    @staticmethod
+    async def serve(host: str, port: int) -> None:
+        async with await start_relay(host, port) as server:
+            await server.serve_forever()
@@ -0,0 +1,33 @@
+import time
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from feed.seeding import seed_dataset
+
+
+class Command(BaseCommand):
+    help = ('Bulk generates reproducible synthetic users, follow edges, posts, likes and tags '
+            'with power-law distributions')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--followees', type=float, default=50, help='Mean followees per user')
+        parser.add_argument('--posts', type=float, default=10, help='Mean posts per user')
+        parser.add_argument('--likes', type=float, default=5, help='Mean likes per post')
+        parser.add_argument('--tags', type=int, default=1000, help='Distinct tags')
+        parser.add_argument('--images', type=int, default=0, help='Placeholder image files shared by all posts')
+        parser.add_argument('--media-root', help='Write placeholder images to this directory instead of '
+                                                 'the default storage')
+        parser.add_argument('--label', help='Prefix of generated emails and tags, random by default')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        storage = FileSystemStorage(location=options['media_root']) if options['media_root'] else None
+        dataset = seed_dataset(users=options['users'], followees_per_user=options['followees'],
+                               posts_per_user=options['posts'], likes_per_post=options['likes'],
+                               tags=options['tags'], images=options['images'], image_storage=storage,
+                               random_seed=options['seed'], batch_size=options['batch_size'], label=options['label'])
+        summary = ', '.join(f'{dataset[key]} {key.replace("_", " ")}' for key in
+                            ('users', 'follows', 'posts', 'likes', 'tags', 'post_tags', 'images'))
+        self.stdout.write(self.style.SUCCESS(f'Seeded {summary} in {time.perf_counter() - started:.1f}s'))
@@ -3,14 +3,25 @@
 import os
 from django.db import migrations
 from djangogramm.helpers import get_inmemory_image
-from feed.services import PostService
-from feed.models import Image, AuthorFollower, Like
 
 
 path_to_resources = os.path.join(os.getcwd(), "feed", "migrations", "resource")
 
 
+def create_post(apps, user_id: int, body: str, tags: list):
+    Post = apps.get_model('feed', 'Post')
+    Tag = apps.get_model('feed', 'Tag')
+    PostTag = apps.get_model('feed', 'PostTag')
+    post = Post.objects.create(user_id=user_id, body=body)
+    for tag in tags:
+        tag = Tag.objects.get_or_create(tag=tag)[0]
+        PostTag.objects.create(tag_id=tag.pk, post_id=post.pk)
+    return post
+
+
 def create_posts(apps, schema_editor):
+    Image = apps.get_model('feed', 'Image')
+    Like = apps.get_model('feed', 'Like')
 
     inmemory_image_1 = get_inmemory_image(path_to_folder=path_to_resources, file_name="poland.jpeg")
     inmemory_image_2 = get_inmemory_image(path_to_folder=path_to_resources, file_name="poland2.jpeg")
@@ -20,8 +31,8 @@ def create_posts(apps, schema_editor):
             "body": 'Iceland, Reykjavik!',
             "tags": ['#iceland', '#weather']
          }
-    post = PostService.create_post(user_id=first_post_data['user_id'], body=first_post_data['body'],
-                                   tags=first_post_data['tags'])
+    post = create_post(apps, user_id=first_post_data['user_id'], body=first_post_data['body'],
+                       tags=first_post_data['tags'])
     image_1 = Image.objects.create(image=inmemory_image_1, post_id=post.pk)
     image_2 = Image.objects.create(image=inmemory_image_2, post_id=post.pk)
 
@@ -74,7 +85,7 @@ def create_posts(apps, schema_editor):
     ]
 
     for post_data in other_posts_data:
-        post = PostService.create_post(user_id=post_data['user_id'], body=post_data['body'], tags=post_data['tags'])
+        post = create_post(apps, user_id=post_data['user_id'], body=post_data['body'], tags=post_data['tags'])
         likes = post_data.get('likes')
         if likes:
             for like in likes:
@@ -85,6 +96,7 @@ def create_posts(apps, schema_editor):
 
 
 def create_followers(apps, schema_editor):
+    AuthorFollower = apps.get_model('feed', 'AuthorFollower')
 
     authors_followers = [
         (1, 2),
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_like_count(apps, schema_editor):
+    Post = apps.get_model('feed', 'Post')
+    Like = apps.get_model('feed', 'Like')
+    likes = Like.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(count=Count('id'))
+    Post.objects.update(like_count=Coalesce(Subquery(likes.values('count')), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0003_fill_in_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_like_count, migrations.RunPython.noop),
+    ]
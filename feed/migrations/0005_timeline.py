@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_timeline(apps, schema_editor):
+    Post = apps.get_model('feed', 'Post')
+    AuthorFollower = apps.get_model('feed', 'AuthorFollower')
+    Timeline = apps.get_model('feed', 'Timeline')
+
+    followers = {}
+    for author_id, follower_id in AuthorFollower.objects.values_list('author_id', 'follower_id'):
+        followers.setdefault(author_id, []).append(follower_id)
+
+    entries = []
+    for post_id, user_id, datetime_created in Post.objects.values_list('id', 'user_id', 'datetime_created'):
+        for timeline_user_id in [user_id] + followers.get(user_id, []):
+            entries.append(Timeline(user_id=timeline_user_id, post_id=post_id, datetime_created=datetime_created))
+    Timeline.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('feed', '0004_post_like_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Timeline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('datetime_created', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='feed.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-datetime_created', '-post'], name='timeline_user_created_idx')],
+                'unique_together': {('user', 'post')},
+            },
+        ),
+        migrations.RunPython(fill_timeline, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+from collections import Counter
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_user_stats(apps, schema_editor):
+    User = apps.get_model('users', 'CustomUser')
+    Post = apps.get_model('feed', 'Post')
+    AuthorFollower = apps.get_model('feed', 'AuthorFollower')
+    UserStats = apps.get_model('feed', 'UserStats')
+
+    edges = list(AuthorFollower.objects.values_list('author_id', 'follower_id'))
+    followers = Counter(author_id for author_id, _ in edges)
+    followees = Counter(follower_id for _, follower_id in edges)
+    posts = Counter(Post.objects.values_list('user_id', flat=True))
+
+    UserStats.objects.bulk_create([
+        UserStats(user_id=user_id, followers=followers[user_id], followees=followees[user_id], posts=posts[user_id])
+        for user_id in User.objects.values_list('id', flat=True)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('feed', '0006_post_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('followers', models.PositiveIntegerField(default=0)),
+                ('followees', models.PositiveIntegerField(default=0)),
+                ('posts', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.10 on 2026-10-18 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0007_userstats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='image',
+            name='image',
+            field=models.ImageField(db_index=True, upload_to='images/'),
+        ),
+        migrations.AddIndex(
+            model_name='authorfollower',
+            index=models.Index(fields=['follower', 'author'], name='authorfollower_follower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['post', 'user'], name='like_post_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', '-datetime_created', '-id'], name='post_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-datetime_created', '-id'], name='post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='posttag',
+            index=models.Index(fields=['tag', 'post'], name='posttag_tag_post_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 13:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0008_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='posttag',
+            index=models.Index(fields=['tag', '-datetime_created', '-post'], name='posttag_tag_created_idx'),
+        ),
+    ]
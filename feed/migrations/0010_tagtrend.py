@@ -0,0 +1,44 @@
+# Generated by Django 4.2.10 on 2026-10-18 13:55
+
+from math import exp, log, log1p
+from django.db import migrations, models
+import django.db.models.deletion
+from djangogramm.settings import TRENDING_TAGS_HALF_LIFE_HOURS
+
+
+def fill_tag_trends(apps, schema_editor):
+    PostTag = apps.get_model('feed', 'PostTag')
+    TagTrend = apps.get_model('feed', 'TagTrend')
+
+    rate = log(2) / (TRENDING_TAGS_HALF_LIFE_HOURS * 3600)
+    scores = {}
+    for tag_id, datetime_created in PostTag.objects.values_list('tag_id', 'datetime_created').iterator():
+        score = datetime_created.timestamp() * rate
+        if tag_id in scores:
+            high, low = max(scores[tag_id], score), min(scores[tag_id], score)
+            score = high + log1p(exp(low - high))
+        scores[tag_id] = score
+
+    TagTrend.objects.bulk_create([TagTrend(tag_id=tag_id, score=score) for tag_id, score in scores.items()],
+                                 batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0009_posttag_tag_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagTrend',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend', serialize=False, to='feed.tag')),
+                ('score', models.FloatField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-score', 'tag'], name='tagtrend_score_idx')],
+            },
+        ),
+        migrations.RunPython(fill_tag_trends, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE feed_post_search USING fts5(body, tags)",
+    "CREATE TRIGGER feed_post_search_post_insert AFTER INSERT ON feed_post BEGIN "
+    "INSERT INTO feed_post_search (rowid, body, tags) VALUES (new.id, new.body, ''); END",
+    "CREATE TRIGGER feed_post_search_post_update AFTER UPDATE OF body ON feed_post BEGIN "
+    "UPDATE feed_post_search SET body = new.body WHERE rowid = new.id; END",
+    "CREATE TRIGGER feed_post_search_post_delete AFTER DELETE ON feed_post BEGIN "
+    "DELETE FROM feed_post_search WHERE rowid = old.id; END",
+    "CREATE TRIGGER feed_post_search_posttag_insert AFTER INSERT ON feed_posttag BEGIN "
+    "UPDATE feed_post_search SET tags = (SELECT group_concat(t.tag, ' ') FROM feed_posttag pt "
+    "JOIN feed_tag t ON t.id = pt.tag_id WHERE pt.post_id = new.post_id) WHERE rowid = new.post_id; END",
+    "CREATE TRIGGER feed_post_search_posttag_delete AFTER DELETE ON feed_posttag BEGIN "
+    "UPDATE feed_post_search SET tags = coalesce((SELECT group_concat(t.tag, ' ') FROM feed_posttag pt "
+    "JOIN feed_tag t ON t.id = pt.tag_id WHERE pt.post_id = old.post_id), '') WHERE rowid = old.post_id; END",
+    "INSERT INTO feed_post_search (rowid, body, tags) SELECT p.id, p.body, coalesce((SELECT group_concat(t.tag, ' ') "
+    "FROM feed_posttag pt JOIN feed_tag t ON t.id = pt.tag_id WHERE pt.post_id = p.id), '') FROM feed_post p",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS feed_post_search_post_insert",
+    "DROP TRIGGER IF EXISTS feed_post_search_post_update",
+    "DROP TRIGGER IF EXISTS feed_post_search_post_delete",
+    "DROP TRIGGER IF EXISTS feed_post_search_posttag_insert",
+    "DROP TRIGGER IF EXISTS feed_post_search_posttag_delete",
+    "DROP TABLE IF EXISTS feed_post_search",
+]
+
+
+def run_sqlite(statements: list):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0010_tagtrend'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0011_post_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0012_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
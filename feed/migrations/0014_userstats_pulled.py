@@ -0,0 +1,23 @@
+from django.db import migrations, models
+from djangogramm.settings import TIMELINE_FANOUT_MAX_FOLLOWERS
+
+
+def fill_pulled(apps, schema_editor):
+    UserStats = apps.get_model('feed', 'UserStats')
+    UserStats.objects.filter(followers__gt=TIMELINE_FANOUT_MAX_FOLLOWERS).update(pulled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0013_userstats_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='pulled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(fill_pulled, migrations.RunPython.noop),
+    ]
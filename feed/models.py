@@ -1,4 +1,5 @@
-from django.db.models import Model, ForeignKey, CASCADE, DateTimeField, TextField, CharField, ImageField
+from django.db.models import (Model, ForeignKey, CASCADE, DateTimeField, TextField, CharField, ImageField,
+                              PositiveIntegerField, Index, OneToOneField, FloatField, JSONField, BooleanField)
 from django.contrib.auth import get_user_model
 
 
@@ -6,6 +7,14 @@ class Post(Model):
     user = ForeignKey(get_user_model(), on_delete=CASCADE)
     body = TextField(max_length=250)
     datetime_created = DateTimeField(auto_now_add=True)
+    like_count = PositiveIntegerField(default=0)
+    version = PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            Index(fields=['user', '-datetime_created', '-id'], name='post_user_created_idx'),
+            Index(fields=['-datetime_created', '-id'], name='post_created_idx'),
+        ]
 
     def __str__(self):
         return self.body
@@ -18,6 +27,7 @@ class Like(Model):
 
     class Meta:
         unique_together = ('user', 'post')
+        indexes = [Index(fields=['post', 'user'], name='like_post_user_idx')]
 
 
 class Tag(Model):
@@ -32,10 +42,15 @@ class PostTag(Model):
     tag = ForeignKey(Tag, on_delete=CASCADE)
     datetime_created = DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [Index(fields=['tag', 'post'], name='posttag_tag_post_idx'),
+                   Index(fields=['tag', '-datetime_created', '-post'], name='posttag_tag_created_idx')]
+
 
 class Image(Model):
-    image = ImageField(upload_to="images/")
+    image = ImageField(upload_to="images/", db_index=True)
     post = ForeignKey(Post, on_delete=CASCADE)
+    renditions = JSONField(default=dict, blank=True)
 
 
 class AuthorFollower(Model):
@@ -44,3 +59,31 @@ class AuthorFollower(Model):
 
     class Meta:
         unique_together = ('author', 'follower')
+        indexes = [Index(fields=['follower', 'author'], name='authorfollower_follower_idx')]
+
+
+class Timeline(Model):
+    user = ForeignKey(get_user_model(), on_delete=CASCADE)
+    post = ForeignKey(Post, on_delete=CASCADE)
+    datetime_created = DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [Index(fields=['user', '-datetime_created', '-post'], name='timeline_user_created_idx')]
+
+
+class UserStats(Model):
+    user = OneToOneField(get_user_model(), on_delete=CASCADE, primary_key=True, related_name='stats')
+    followers = PositiveIntegerField(default=0)
+    followees = PositiveIntegerField(default=0)
+    posts = PositiveIntegerField(default=0)
+    version = PositiveIntegerField(default=0)
+    pulled = BooleanField(default=False)
+
+
+class TagTrend(Model):
+    tag = OneToOneField(Tag, on_delete=CASCADE, primary_key=True, related_name='trend')
+    score = FloatField()
+
+    class Meta:
+        indexes = [Index(fields=['-score', 'tag'], name='tagtrend_score_idx')]
@@ -1,34 +1,67 @@
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Optional
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.db.models.query import QuerySet
-from django.db.models import Q
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q, F, Count, Case, When, Value, CharField
 from users.models import CustomUser
-from feed.models import Image, Like, Tag, PostTag, Post, AuthorFollower
+from feed.models import Image, Like, Tag, PostTag, Post, AuthorFollower, Timeline, UserStats, TagTrend
+from djangogramm.settings import TIMELINE_BATCH_SIZE
 
 
 class PostRepository:
+    VALUE_FIELDS = ('id', 'body', 'datetime_created', 'like_count', 'user_id', 'user__first_name', 'user__last_name',
+                    'user__avatar')
 
     @staticmethod
     def get_all_posts() -> QuerySet:
-        return (Post.objects.select_related('user').prefetch_related('image_set', 'like_set__user', 'posttag_set__tag')
-                .all().order_by('-datetime_created'))
+        return (Post.objects.select_related('user').prefetch_related('image_set', 'posttag_set__tag')
+                .all().order_by('-datetime_created', '-id'))
 
     @staticmethod
     def get_profile_posts(user_id: int) -> QuerySet:
-        return Post.objects.select_related('user').prefetch_related('image_set', 'like_set__user', 'posttag_set__tag')\
-            .filter(user_id=user_id).order_by('-datetime_created')
+        return Post.objects.select_related('user').prefetch_related('image_set', 'posttag_set__tag')\
+            .filter(user_id=user_id).order_by('-datetime_created', '-id')
 
     @staticmethod
-    def get_feed_posts(follower_id: int) -> QuerySet:
-        return (Post.objects.select_related('user').prefetch_related('image_set', 'like_set__user', 'posttag_set__tag')
-                .filter(user_id__author__follower=follower_id)
-                .union(Post.objects.select_related('user')
-                       .prefetch_related('image_set', 'like_set__user', 'posttag_set__tag')
-                       .filter(user_id=follower_id))
-                .order_by('-datetime_created'))
+    def get_timeline_posts(user_id: int) -> QuerySet:
+        return (Post.objects.select_related('user').prefetch_related('image_set', 'posttag_set__tag')
+                .filter(timeline__user_id=user_id)
+                .annotate(timeline_created=F('timeline__datetime_created'), timeline_post_id=F('timeline__post_id'))
+                .order_by('-timeline_created', '-timeline_post_id'))
+
+    @staticmethod
+    def get_tag_posts(tag_id: int) -> QuerySet:
+        return (Post.objects.select_related('user').prefetch_related('image_set', 'posttag_set__tag')
+                .filter(posttag__tag_id=tag_id)
+                .annotate(tag_created=F('posttag__datetime_created'), tag_post_id=F('posttag__post_id'))
+                .order_by('-tag_created', '-tag_post_id'))
+
+    @staticmethod
+    def get_posts_by_ids(post_ids: list) -> dict:
+        return Post.objects.select_related('user').prefetch_related('image_set', 'posttag_set__tag')\
+            .in_bulk(post_ids)
+
+    @staticmethod
+    def get_merged_timeline_posts(user_id: int, pulled_author_ids: list) -> QuerySet:
+        timeline_post_ids = Timeline.objects.filter(user_id=user_id).values('post_id')
+        return (Post.objects.select_related('user').prefetch_related('image_set', 'posttag_set__tag')
+                .filter(Q(pk__in=timeline_post_ids) | Q(user_id__in=pulled_author_ids))
+                .annotate(timeline_created=F('datetime_created'), timeline_post_id=F('id'))
+                .order_by('-timeline_created', '-timeline_post_id'))
+
+    @staticmethod
+    def get_values(posts: QuerySet, *extra_fields: str) -> QuerySet:
+        return posts.select_related(None).prefetch_related(None).values(*PostRepository.VALUE_FIELDS, *extra_fields)
+
+    @staticmethod
+    def get_post_values(post_id: int) -> dict:
+        return Post.objects.values(*PostRepository.VALUE_FIELDS).get(pk=post_id)
 
     @staticmethod
     def get_post_with_likes(post_id: int) -> QuerySet:
-        return Post.objects.select_related('user').prefetch_related('like_set__user').get(id=post_id)
+        return Post.objects.select_related('user').get(id=post_id)
 
     @staticmethod
     def get_id(post: Post) -> int:
@@ -46,10 +79,6 @@ class PostRepository:
     def get_images(post: Post) -> list:
         return [image.image.url for image in post.image_set.all()]
 
-    @staticmethod
-    def get_likes(post: Post) -> list:
-        return [like.user.pk for like in post.like_set.all()]
-
     @staticmethod
     def get_tags(post: Post) -> str:
         return " ".join([t.tag.tag for t in post.posttag_set.all()])
@@ -58,6 +87,127 @@ class PostRepository:
     def add(user_id: int, body: str) -> Post:
         return Post.objects.create(user_id=user_id, body=body)
 
+    @staticmethod
+    def change_like_count(post_id: int, delta: int) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE {post} SET like_count = like_count + %s, version = version + 1 WHERE id = %s '
+                           'RETURNING like_count'.format(post=Post._meta.db_table), [delta, post_id])
+            row = cursor.fetchone()
+        if row is None:
+            raise Post.DoesNotExist('Post matching query does not exist.')
+        return row[0]
+
+    @staticmethod
+    def get_like_count(post_id: int) -> int:
+        return Post.objects.values_list('like_count', flat=True).get(pk=post_id)
+
+    @staticmethod
+    def get_version(post_id: int) -> Optional[int]:
+        return Post.objects.filter(pk=post_id).values_list('version', flat=True).first()
+
+    @staticmethod
+    def get_version_values(posts: QuerySet, *fields: str) -> QuerySet:
+        fields = dict.fromkeys(('id', 'version', 'user_id', *fields))
+        return posts.select_related(None).prefetch_related(None).values(*fields)
+
+    @staticmethod
+    def bump_version(post_id: int) -> None:
+        Post.objects.filter(pk=post_id).update(version=F('version') + 1)
+
+    @staticmethod
+    def bump_versions(post_ids: list) -> None:
+        Post.objects.filter(pk__in=post_ids).update(version=F('version') + 1)
+
+    @staticmethod
+    def bump_image_versions(image_paths: list) -> None:
+        Post.objects.filter(image__image__in=image_paths).update(version=F('version') + 1)
+
+    @staticmethod
+    def reconcile_like_counts(batch_size: int) -> int:
+        updated = 0
+        last_id = 0
+        while True:
+            posts = list(Post.objects.filter(id__gt=last_id).order_by('id')
+                         .annotate(actual_like_count=Count('like'))[:batch_size])
+            if not posts:
+                return updated
+            last_id = posts[-1].pk
+            drifted = [post for post in posts if post.like_count != post.actual_like_count]
+            for post in drifted:
+                post.like_count = post.actual_like_count
+            updated += Post.objects.bulk_update(drifted, ['like_count'])
+
+
+class TimelineRepository:
+    @staticmethod
+    def add(post: Post, user_ids: list) -> None:
+        Timeline.objects.bulk_create(
+            [Timeline(user_id=user_id, post_id=post.pk, datetime_created=post.datetime_created) for user_id in user_ids],
+            ignore_conflicts=True, batch_size=TIMELINE_BATCH_SIZE)
+
+    @staticmethod
+    def backfill(author_id: int, follower_ids: list, since: datetime = None) -> None:
+        posts = Post.objects.filter(user_id=author_id)
+        if since is not None:
+            posts = posts.filter(datetime_created__gte=since)
+        posts = posts.values_list('id', 'datetime_created')
+        entries = []
+        for post_id, datetime_created in posts.iterator(chunk_size=TIMELINE_BATCH_SIZE):
+            for follower_id in follower_ids:
+                entries.append(Timeline(user_id=follower_id, post_id=post_id, datetime_created=datetime_created))
+            if len(entries) >= TIMELINE_BATCH_SIZE:
+                Timeline.objects.bulk_create(entries, ignore_conflicts=True)
+                entries = []
+        Timeline.objects.bulk_create(entries, ignore_conflicts=True)
+
+    @staticmethod
+    def fan_out_range(first_post_id: int, last_post_id: int) -> None:
+        tables = {'timeline': Timeline._meta.db_table, 'post': Post._meta.db_table,
+                  'author_follower': AuthorFollower._meta.db_table, 'stats': UserStats._meta.db_table}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {timeline} (user_id, post_id, datetime_created) '
+                'SELECT p.user_id, p.id, p.datetime_created FROM {post} p WHERE p.id BETWEEN %s AND %s '
+                'UNION ALL '
+                'SELECT af.follower_id, p.id, p.datetime_created FROM {post} p '
+                'JOIN {author_follower} af ON af.author_id = p.user_id '
+                'JOIN {stats} s ON s.user_id = p.user_id AND s.pulled = %s '
+                'WHERE p.id BETWEEN %s AND %s'.format(**tables),
+                [first_post_id, last_post_id, False, first_post_id, last_post_id])
+
+    @staticmethod
+    def prune(author_id: int, follower_id: int) -> None:
+        Timeline.objects.filter(user_id=follower_id, post__user_id=author_id).delete()
+
+
+class PostSearchRepository:
+    @staticmethod
+    def search(match: str, offset: int, limit: int) -> list:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT rowid FROM feed_post_search WHERE feed_post_search MATCH %s '
+                           'ORDER BY rank, rowid DESC LIMIT %s OFFSET %s', [match, limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def rebuild(batch_size: int) -> int:
+        indexed = 0
+        last_id = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('DELETE FROM feed_post_search')
+            while True:
+                posts = list(Post.objects.filter(id__gt=last_id).order_by('id')
+                             .values_list('id', 'body')[:batch_size])
+                if not posts:
+                    return indexed
+                tags = defaultdict(list)
+                for post_id, tag in PostTag.objects.filter(post_id__in=[post_id for post_id, _ in posts])\
+                        .order_by('id').values_list('post_id', 'tag__tag'):
+                    tags[post_id].append(tag)
+                cursor.executemany('INSERT INTO feed_post_search (rowid, body, tags) VALUES (%s, %s, %s)',
+                                   [(post_id, body, ' '.join(tags[post_id])) for post_id, body in posts])
+                indexed += len(posts)
+                last_id = posts[-1][0]
+
 
 class ImageRepository:
     @staticmethod
@@ -65,8 +215,53 @@ class ImageRepository:
         Image.objects.create(image=image, post=post)
 
     @staticmethod
-    def update(current_path: str, new_path: str) -> None:
-        return Image.objects.filter(image=current_path).update(image=new_path)
+    def add_many(images: list, post: Post) -> list:
+        return [image.pk for image in Image.objects.bulk_create([Image(image=image, post=post) for image in images])]
+
+    @staticmethod
+    def get_storage():
+        return Image._meta.get_field('image').storage
+
+    @staticmethod
+    def get_without_renditions(regenerate: bool = False) -> QuerySet:
+        return Image.objects.all() if regenerate else Image.objects.filter(renditions={})
+
+    @staticmethod
+    def get_paths(image_ids: list) -> list:
+        return list(Image.objects.filter(id__in=image_ids).values_list('id', 'image', 'post_id'))
+
+    @staticmethod
+    def get_by_post_ids(post_ids: list) -> dict:
+        images = defaultdict(list)
+        for post_id, path, renditions in Image.objects.filter(post_id__in=post_ids).order_by('id')\
+                .values_list('post_id', 'image', 'renditions'):
+            images[post_id].append((path, renditions))
+        return images
+
+    @staticmethod
+    def set_renditions(renditions: dict) -> None:
+        Image.objects.bulk_update([Image(id=image_id, renditions=value) for image_id, value in renditions.items()],
+                                  fields=['renditions'])
+
+    @staticmethod
+    def upload(image: InMemoryUploadedFile) -> str:
+        field = Image._meta.get_field('image')
+        return field.storage.save(field.generate_filename(None, image.name), image, max_length=field.max_length)
+
+    @staticmethod
+    def delete_files(names: list) -> None:
+        storage = ImageRepository.get_storage()
+        for name in names:
+            storage.delete(name)
+
+    @staticmethod
+    def update_many(paths: dict) -> dict:
+        found = Counter(Image.objects.filter(image__in=paths).values_list('image', flat=True))
+        if found:
+            Image.objects.filter(image__in=found).update(image=Case(
+                *[When(image=current_path, then=Value(paths[current_path])) for current_path in found],
+                output_field=CharField()))
+        return found
 
 
 class LikeRepository:
@@ -75,24 +270,68 @@ class LikeRepository:
         Like.objects.create(post_id=post_id, user_id=user_id)
 
     @staticmethod
-    def delete(post_id: int, user_id: int) -> None:
-        Like.objects.filter(post_id=post_id, user_id=user_id).delete()
+    def add_if_missing(post_id: int, user_id: int) -> bool:
+        try:
+            with transaction.atomic():
+                Like.objects.create(post_id=post_id, user_id=user_id)
+        except IntegrityError:
+            if LikeRepository.check_like(post_id=post_id, user_id=user_id):
+                return False
+            raise Post.DoesNotExist('Post matching query does not exist.')
+        return True
+
+    @staticmethod
+    def delete(post_id: int, user_id: int) -> int:
+        return Like.objects.filter(post_id=post_id, user_id=user_id).delete()[0]
 
     @staticmethod
     def check_like(post_id: int, user_id: int) -> bool:
         return Like.objects.filter(post_id=post_id, user_id=user_id).exists()
 
+    @staticmethod
+    def get_liked_post_ids(user_id: int, post_ids: list) -> set:
+        return set(Like.objects.filter(user_id=user_id, post_id__in=post_ids).values_list('post_id', flat=True))
+
 
 class TagRepository:
     @staticmethod
-    def get_or_add(tag: str) -> Tag:
-        return Tag.objects.get_or_create(tag=tag)[0]
+    def get_id(tag: str) -> int:
+        return Tag.objects.values_list('id', flat=True).get(tag=tag)
+
+    @staticmethod
+    def get_or_add_many(tags: set) -> dict:
+        Tag.objects.bulk_create([Tag(tag=tag) for tag in tags], ignore_conflicts=True)
+        return dict(Tag.objects.filter(tag__in=tags).values_list('tag', 'id'))
+
+
+class TagTrendRepository:
+    @staticmethod
+    def get_scores(tag_ids: list) -> dict:
+        return dict(TagTrend.objects.filter(tag_id__in=tag_ids).values_list('tag_id', 'score'))
+
+    @staticmethod
+    def save_scores(scores: dict) -> None:
+        TagTrend.objects.bulk_create([TagTrend(tag_id=tag_id, score=score) for tag_id, score in scores.items()],
+                                     update_conflicts=True, unique_fields=['tag'], update_fields=['score'])
+
+    @staticmethod
+    def get_top(amount: int) -> list:
+        return [list(row) for row in
+                TagTrend.objects.order_by('-score', 'tag').values_list('score', 'tag__tag')[:amount]]
 
 
 class PostTagRepository:
     @staticmethod
-    def add(tag_id: int, post_id: int) -> None:
-        PostTag.objects.create(tag_id=tag_id, post_id=post_id)
+    def add_many(post_tag_ids: list) -> None:
+        PostTag.objects.bulk_create([PostTag(post_id=post_id, tag_id=tag_id) for post_id, tag_id in post_tag_ids])
+
+    @staticmethod
+    def get_by_post_ids(post_ids: list) -> dict:
+        tags = defaultdict(list)
+        for post_id, tag in PostTag.objects.filter(post_id__in=post_ids).order_by('id')\
+                .values_list('post_id', 'tag__tag'):
+            tags[post_id].append(tag)
+        return tags
 
 
 class AuthorFollowerRepository:
@@ -101,18 +340,109 @@ class AuthorFollowerRepository:
         AuthorFollower.objects.create(author_id=author_id, follower_id=follower_id)
 
     @staticmethod
-    def delete(author_id: int, follower_id: int) -> None:
-        AuthorFollower.objects.filter(author_id=author_id, follower_id=follower_id).delete()
+    def delete(author_id: int, follower_id: int) -> int:
+        return AuthorFollower.objects.filter(author_id=author_id, follower_id=follower_id).delete()[0]
 
     @staticmethod
     def is_following(author_id: int, follower_id: int) -> bool:
         return AuthorFollower.objects.filter(author_id=author_id, follower_id=follower_id).exists()
 
     @staticmethod
-    def get_all_stats(user_id: int) -> QuerySet:
-        return (AuthorFollower.objects.filter(Q(author_id=user_id) | Q(follower_id=user_id))
-                .values_list('author_id', 'follower_id'))
+    def get_follower_ids(author_id: int) -> list:
+        return list(AuthorFollower.objects.filter(author_id=author_id).values_list('follower_id', flat=True))
+
+    @staticmethod
+    def get_followee_ids(follower_id: int) -> list:
+        return list(AuthorFollower.objects.filter(follower_id=follower_id).values_list('author_id', flat=True))
+
+    @staticmethod
+    def get_follower_id_batches(author_id: int, batch_size: int):
+        last_id = 0
+        while True:
+            follower_ids = list(AuthorFollower.objects.filter(author_id=author_id, follower_id__gt=last_id)
+                                .order_by('follower_id').values_list('follower_id', flat=True)[:batch_size])
+            if not follower_ids:
+                return
+            last_id = follower_ids[-1]
+            yield follower_ids
 
     @staticmethod
-    def get_followers_stats(author_id: int) -> int:
-        return AuthorFollower.objects.filter(author_id=author_id).count()
+    def get_pulled_author_ids(follower_id: int) -> list:
+        return list(AuthorFollower.objects.filter(follower_id=follower_id, author__stats__pulled=True)
+                    .values_list('author_id', flat=True))
+
+
+class UserStatsRepository:
+    FIELDS = ('followers', 'followees', 'posts')
+
+    @staticmethod
+    def get(user_id: int) -> dict:
+        stats = UserStats.objects.filter(user_id=user_id).values(*UserStatsRepository.FIELDS).first()
+        return stats or dict.fromkeys(UserStatsRepository.FIELDS, 0)
+
+    @staticmethod
+    def get_fan_out(user_id: int) -> tuple:
+        return UserStats.objects.filter(user_id=user_id).values_list('followers', 'pulled').first() or (0, False)
+
+    @staticmethod
+    def set_pulled(user_id: int, pulled: bool) -> None:
+        UserStats.objects.filter(user_id=user_id).update(pulled=pulled)
+
+    @staticmethod
+    def get_resumable_author_ids(max_followers: int) -> list:
+        return list(UserStats.objects.filter(pulled=True, followers__lte=max_followers)
+                    .values_list('user_id', flat=True))
+
+    @staticmethod
+    def get_versions(user_ids: list) -> dict:
+        return dict(UserStats.objects.filter(user_id__in=user_ids).values_list('user_id', 'version'))
+
+    @staticmethod
+    def bump_versions(user_ids: list) -> None:
+        UserStats.objects.bulk_create([UserStats(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+        UserStats.objects.filter(user_id__in=user_ids).update(version=F('version') + 1)
+
+    @staticmethod
+    def bump_avatar_versions(avatar_paths: list) -> None:
+        UserStats.objects.filter(user__avatar__in=avatar_paths).update(version=F('version') + 1)
+
+    @staticmethod
+    def change(user_id: int, **deltas: int) -> None:
+        changes = {field: F(field) + delta for field, delta in deltas.items()}
+        if not UserStats.objects.filter(user_id=user_id).update(**changes):
+            UserStats.objects.bulk_create([UserStats(user_id=user_id)], ignore_conflicts=True)
+            UserStats.objects.filter(user_id=user_id).update(**changes)
+
+    @staticmethod
+    def get_user_id_batches(batch_size: int):
+        last_id = 0
+        while True:
+            user_ids = list(CustomUser.objects.filter(id__gt=last_id).order_by('id')
+                            .values_list('id', flat=True)[:batch_size])
+            if not user_ids:
+                return
+            last_id = user_ids[-1]
+            yield user_ids
+
+    @staticmethod
+    def count_by(queryset: QuerySet, field: str) -> Counter:
+        rows = queryset.order_by().values(field).annotate(amount=Count('id')).values_list(field, 'amount')
+        return Counter(dict(rows))
+
+    @staticmethod
+    def repair(user_ids: list) -> int:
+        followers = UserStatsRepository.count_by(AuthorFollower.objects.filter(author_id__in=user_ids), 'author_id')
+        followees = UserStatsRepository.count_by(AuthorFollower.objects.filter(follower_id__in=user_ids), 'follower_id')
+        posts = UserStatsRepository.count_by(Post.objects.filter(user_id__in=user_ids), 'user_id')
+        current = {stats.pop('user_id'): stats for stats in
+                   UserStats.objects.filter(user_id__in=user_ids).values('user_id', *UserStatsRepository.FIELDS)}
+
+        drifted = []
+        for user_id in user_ids:
+            actual = {'followers': followers[user_id], 'followees': followees[user_id], 'posts': posts[user_id]}
+            if current.get(user_id) != actual:
+                drifted.append(UserStats(user_id=user_id, **actual))
+        UserStats.objects.bulk_create(drifted, update_conflicts=True, unique_fields=['user'],
+                                      update_fields=list(UserStatsRepository.FIELDS))
+        UserStats.objects.filter(user_id__in=[stats.user_id for stats in drifted]).update(version=F('version') + 1)
+        return len(drifted)
@@ -0,0 +1,141 @@
+import random
+from collections import Counter
+from io import BytesIO
+from itertools import accumulate
+from uuid import uuid4
+from PIL import Image as PillowImage
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from users.models import CustomUser
+from feed.models import Post, Like, Tag, PostTag, Image, AuthorFollower, UserStats
+from feed.repository import TimelineRepository
+from feed.services import TrendingTagService
+from djangogramm.settings import TIMELINE_FANOUT_MAX_FOLLOWERS
+
+SEED_PASSWORD = '8uhb5thm'
+PARETO_SHAPE = 2.5
+ZIPF_EXPONENT = 1.1
+MAX_MEAN_MULTIPLIER = 100
+MAX_TAGS_PER_POST = 3
+MAX_IMAGES_PER_POST = 3
+
+
+def heavy_tailed_amount(rnd: random.Random, mean: float, limit: int = None) -> int:
+    if mean <= 0:
+        return 0
+    amount = round(mean * (PARETO_SHAPE - 1) * (rnd.paretovariate(PARETO_SHAPE) - 1))
+    amount = min(amount, round(mean * MAX_MEAN_MULTIPLIER))
+    return amount if limit is None else max(0, min(amount, limit))
+
+
+def zipf_cum_weights(amount: int) -> list:
+    return list(accumulate(1 / (rank + 1) ** ZIPF_EXPONENT for rank in range(amount)))
+
+
+def create_users(amount: int, label: str, batch_size: int) -> list:
+    password = make_password(SEED_PASSWORD)
+    user_ids = []
+    for start in range(0, amount, batch_size):
+        users = [CustomUser(email=f'{label}-{number}@example.com', activation_link=str(uuid4()), first_name='Seed',
+                            last_name=f'User {number}', password=password, is_active=True)
+                 for number in range(start, min(start + batch_size, amount))]
+        user_ids.extend(user.pk for user in CustomUser.objects.bulk_create(users))
+    return user_ids
+
+
+def create_placeholder_images(amount: int, label: str, storage) -> list:
+    names = []
+    for number in range(amount):
+        buffer = BytesIO()
+        color = tuple((number * step) % 256 for step in (67, 137, 211))
+        PillowImage.new('RGB', (640, 640), color).save(buffer, format='JPEG')
+        names.append(storage.save(f'images/{label}-{number}.jpeg', ContentFile(buffer.getvalue())))
+    return names
+
+
+def seed_dataset(users: int, followees_per_user: float, posts_per_user: float, likes_per_post: float, tags: int,
+                 images: int = 0, image_storage=None, random_seed: int = 0, batch_size: int = 1000,
+                 label: str = None) -> dict:
+    rnd = random.Random(random_seed)
+    label = label or f'seed-{uuid4().hex[:8]}'
+
+    user_ids = create_users(users, label=label, batch_size=batch_size)
+    popularity = user_ids[:]
+    rnd.shuffle(popularity)
+    popularity_weights = zipf_cum_weights(len(popularity))
+
+    followers = dict.fromkeys(user_ids, 0)
+    followees = dict.fromkeys(user_ids, 0)
+    follows = 0
+    for start in range(0, len(user_ids), batch_size):
+        edges = []
+        for follower_id in user_ids[start:start + batch_size]:
+            amount = heavy_tailed_amount(rnd, followees_per_user, limit=len(user_ids) - 1)
+            author_ids = set(rnd.choices(popularity, cum_weights=popularity_weights, k=amount))
+            author_ids.discard(follower_id)
+            for author_id in sorted(author_ids):
+                followers[author_id] += 1
+                edges.append(AuthorFollower(author_id=author_id, follower_id=follower_id))
+            followees[follower_id] = len(author_ids)
+        with transaction.atomic():
+            AuthorFollower.objects.bulk_create(edges)
+        follows += len(edges)
+
+    posts_amount = {user_id: heavy_tailed_amount(rnd, posts_per_user) for user_id in user_ids}
+    for start in range(0, len(user_ids), batch_size):
+        UserStats.objects.bulk_create([UserStats(user_id=user_id, followers=followers[user_id],
+                                                 followees=followees[user_id], posts=posts_amount[user_id],
+                                                 pulled=followers[user_id] > TIMELINE_FANOUT_MAX_FOLLOWERS)
+                                       for user_id in user_ids[start:start + batch_size]])
+
+    tag_names = [f'#{label.replace("-", "")}t{number}' for number in range(tags)]
+    tag_ids = [tag.pk for tag in Tag.objects.bulk_create([Tag(tag=tag) for tag in tag_names], batch_size=batch_size)]
+    tag_names_by_id = dict(zip(tag_ids, tag_names))
+    tag_weights = zipf_cum_weights(len(tag_ids))
+    image_names = create_placeholder_images(images, label=label, storage=image_storage or Image.image.field.storage)
+
+    totals = {'posts': 0, 'likes': 0, 'post_tags': 0, 'images': 0}
+    first_post_id = last_post_id = None
+    author_ids = [user_id for user_id in user_ids for _ in range(posts_amount[user_id])]
+    rnd.shuffle(author_ids)
+    for start in range(0, len(author_ids), batch_size):
+        pending = [Post(user_id=author_id, body=f'Post {number}',
+                        like_count=heavy_tailed_amount(rnd, likes_per_post, limit=len(user_ids)))
+                   for number, author_id in enumerate(author_ids[start:start + batch_size], start)]
+        with transaction.atomic():
+            posts = Post.objects.bulk_create(pending)
+            likes, post_tags, post_images = [], [], []
+            for post in posts:
+                likes.extend(Like(post_id=post.pk, user_id=user_id)
+                             for user_id in rnd.sample(user_ids, post.like_count))
+                if tag_ids:
+                    post_tags.extend(PostTag(post_id=post.pk, tag_id=tag_id) for tag_id in set(rnd.choices(
+                        tag_ids, cum_weights=tag_weights, k=rnd.randint(0, MAX_TAGS_PER_POST))))
+                if image_names:
+                    post_images.extend(Image(post_id=post.pk, image=name) for name in
+                                       rnd.choices(image_names, k=rnd.randint(1, MAX_IMAGES_PER_POST)))
+            Like.objects.bulk_create(likes)
+            PostTag.objects.bulk_create(post_tags)
+            Image.objects.bulk_create(post_images)
+            if post_tags:
+                TrendingTagService.record(
+                    tag_counts=Counter(tag_names_by_id[post_tag.tag_id] for post_tag in post_tags),
+                    tag_ids=dict(zip(tag_names, tag_ids)))
+            TimelineRepository.fan_out_range(first_post_id=posts[0].pk, last_post_id=posts[-1].pk)
+        first_post_id = first_post_id or posts[0].pk
+        last_post_id = posts[-1].pk
+        totals['posts'] += len(posts)
+        totals['likes'] += len(likes)
+        totals['post_tags'] += len(post_tags)
+        totals['images'] += len(post_images)
+
+    return {
+        'user_ids': user_ids,
+        'first_post_id': first_post_id,
+        'last_post_id': last_post_id,
+        'users': len(user_ids),
+        'follows': follows,
+        'tags': len(tag_ids),
+        **totals,
+    }
@@ -1,9 +1,30 @@
+import logging
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime
+from math import exp, log, log1p
+from typing import Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.db import transaction, close_old_connections
 from django.db.models.query import QuerySet
+from django.utils import timezone
 from feed.repository import (PostRepository, TagRepository, LikeRepository, ImageRepository, PostTagRepository,
-                             AuthorFollowerRepository)
+                             AuthorFollowerRepository, TimelineRepository, UserStatsRepository, TagTrendRepository,
+                             PostSearchRepository)
 from feed.models import Post
+from users.repository import UserRepository
+from feed.helpers import CursorPage, decode_offset, get_offset_page, get_cursor_page
+from feed.events import get_broker, get_post_channel, get_author_channel, LIKE, NEW_POSTS
+from djangogramm.settings import (TIMELINE_FANOUT_MAX_FOLLOWERS, TIMELINE_FANOUT_RESUME_FOLLOWERS, TIMELINE_BATCH_SIZE,
+                                  TRENDING_TAGS_HALF_LIFE_HOURS, TRENDING_TAGS_SIZE, POSTS_PER_PAGE,
+                                  IMAGE_UPLOAD_WORKERS, LOCAL_THUMBNAILS, THUMBNAIL_WORKERS)
+from djangogramm.aws_resource.thumbnails import make_renditions, get_rendition_key, is_avatar, ALTERNATE_FORMATS
+
+
+logger = logging.getLogger(__name__)
 
 
 class PostService:
@@ -18,57 +39,443 @@ class PostService:
 
     @staticmethod
     def get_feed_posts(follower_id: int) -> QuerySet:
-        return PostRepository.get_feed_posts(follower_id)
+        pulled_author_ids = AuthorFollowerRepository.get_pulled_author_ids(follower_id=follower_id)
+        if pulled_author_ids:
+            return PostRepository.get_merged_timeline_posts(user_id=follower_id, pulled_author_ids=pulled_author_ids)
+        return PostRepository.get_timeline_posts(user_id=follower_id)
+
+    @staticmethod
+    def get_tag_posts(tag: str) -> QuerySet:
+        return PostRepository.get_tag_posts(TagRepository.get_id(tag))
 
     @staticmethod
-    def create_post(user_id: int, body: str, tags: list) -> Post:
-        post = PostRepository.add(user_id=user_id, body=body)
-        if tags:
-            for tag in tags:
-                tag = TagRepository.get_or_add(tag=tag)
-                PostTagRepository.add(tag_id=tag.pk, post_id=post.pk)
+    def create_post(user_id: int, body: str, tags: list, images: list = None) -> Post:
+        image_names = ImageService.upload_many(images) if images else []
+        with transaction.atomic():
+            try:
+                post = PostRepository.add(user_id=user_id, body=body)
+                UserStatsRepository.change(user_id=user_id, posts=1, version=1)
+                if tags:
+                    PostService.link_tags({post.pk: tags}, bump_versions=False)
+                if image_names:
+                    image_ids = ImageRepository.add_many(images=image_names, post=post)
+                    if LOCAL_THUMBNAILS:
+                        transaction.on_commit(lambda: ThumbnailService.schedule_renditions(
+                            ThumbnailService.make_image_renditions, image_ids), robust=True)
+                TimelineService.fan_out(post=post, author_id=user_id)
+                transaction.on_commit(lambda: EventService.publish_post(post_id=post.pk, author_id=user_id),
+                                      robust=True)
+            except Exception:
+                ImageRepository.delete_files(image_names)
+                raise
         return post
 
+    @staticmethod
+    def get_feed_versions(viewer_id: Optional[int], cursor: str = None) -> CursorPage:
+        if viewer_id is None:
+            return PostService.get_version_page(PostService.get_all_posts(), cursor=cursor)
+        return PostService.get_version_page(PostService.get_feed_posts(viewer_id), cursor=cursor,
+                                            created_field='timeline_created', id_field='timeline_post_id')
+
+    @staticmethod
+    def get_profile_versions(user_id: int, cursor: str = None) -> CursorPage:
+        return PostService.get_version_page(PostService.get_profile_posts(user_id), cursor=cursor)
+
+    @staticmethod
+    def get_version_page(posts: QuerySet, cursor: str = None, created_field: str = 'datetime_created',
+                         id_field: str = 'id') -> CursorPage:
+        return get_cursor_page(posts=PostRepository.get_version_values(posts, created_field, id_field), cursor=cursor,
+                               created_field=created_field, id_field=id_field)
+
+    @staticmethod
+    def load_page(version_page: CursorPage) -> CursorPage:
+        posts = PostRepository.get_posts_by_ids([values['id'] for values in version_page])
+        return CursorPage(object_list=[posts[values['id']] for values in version_page if values['id'] in posts],
+                          next_cursor=version_page.next_cursor, previous_cursor=version_page.previous_cursor)
+
+    @staticmethod
+    def link_tags(tags_by_post_id: dict, bump_versions: bool = True) -> None:
+        tag_ids = TagRepository.get_or_add_many({tag for tags in tags_by_post_id.values() for tag in tags})
+        PostTagRepository.add_many([(post_id, tag_ids[tag])
+                                    for post_id, tags in tags_by_post_id.items() for tag in tags])
+        TrendingTagService.record(tag_counts=Counter(tag for tags in tags_by_post_id.values() for tag in tags),
+                                  tag_ids=tag_ids)
+        if bump_versions:
+            PostRepository.bump_versions(post_ids=list(tags_by_post_id))
+
     @staticmethod
     def get_post_with_likes(post_id: int) -> QuerySet:
         return PostRepository.get_post_with_likes(post_id=post_id)
 
+    @staticmethod
+    def reconcile_like_counts(batch_size: int = 1000) -> int:
+        return PostRepository.reconcile_like_counts(batch_size=batch_size)
+
+
+class TimelineService:
+
+    @staticmethod
+    def fan_out(post: Post, author_id: int) -> None:
+        if UserStatsRepository.get_fan_out(author_id)[1]:
+            TimelineRepository.add(post=post, user_ids=[author_id])
+        else:
+            follower_ids = AuthorFollowerRepository.get_follower_ids(author_id)
+            TimelineRepository.add(post=post, user_ids=[author_id] + follower_ids)
+
+    @staticmethod
+    def follow(author_id: int, follower_id: int) -> None:
+        followers, pulled = UserStatsRepository.get_fan_out(author_id)
+        if pulled:
+            return
+        if followers > TIMELINE_FANOUT_MAX_FOLLOWERS:
+            UserStatsRepository.set_pulled(user_id=author_id, pulled=True)
+        else:
+            TimelineRepository.backfill(author_id=author_id, follower_ids=[follower_id])
+
+    @staticmethod
+    def unfollow(author_id: int, follower_id: int) -> None:
+        TimelineRepository.prune(author_id=author_id, follower_id=follower_id)
+
+    @staticmethod
+    def backfill_followers(author_id: int, batch_size: int, since: datetime = None) -> None:
+        for follower_ids in AuthorFollowerRepository.get_follower_id_batches(author_id, batch_size=batch_size):
+            TimelineRepository.backfill(author_id=author_id, follower_ids=follower_ids, since=since)
+
+    @staticmethod
+    def resume_fan_out(batch_size: int = TIMELINE_BATCH_SIZE) -> int:
+        # pulled authors are pushed again only well below the pull threshold, so counts around it cannot flap
+        author_ids = UserStatsRepository.get_resumable_author_ids(max_followers=TIMELINE_FANOUT_RESUME_FOLLOWERS)
+        for author_id in author_ids:
+            started = timezone.now()
+            TimelineService.backfill_followers(author_id, batch_size=batch_size)
+            UserStatsRepository.set_pulled(user_id=author_id, pulled=False)
+            # posts made during the first pass were neither pushed nor copied yet
+            TimelineService.backfill_followers(author_id, batch_size=batch_size, since=started)
+        return len(author_ids)
+
+
+class TrendingTagService:
+    CACHE_KEY = 'trending_tags'
+    CACHE_TIMEOUT = 600
+
+    @staticmethod
+    def get_weight(moment: datetime) -> float:
+        # forward decay: weights grow with time instead of old scores shrinking, so stored scores never need a rescan
+        return moment.timestamp() * log(2) / (TRENDING_TAGS_HALF_LIFE_HOURS * 3600)
+
+    @staticmethod
+    def add_scores(first: float, second: float) -> float:
+        high, low = max(first, second), min(first, second)
+        return high + log1p(exp(low - high))
+
+    @staticmethod
+    def record(tag_counts: dict, tag_ids: dict, moment: datetime = None) -> None:
+        weight = TrendingTagService.get_weight(moment or timezone.now())
+        current = TagTrendRepository.get_scores([tag_ids[tag] for tag in tag_counts])
+        scores = {}
+        for tag, amount in tag_counts.items():
+            score = weight + log(amount)
+            if tag_ids[tag] in current:
+                score = TrendingTagService.add_scores(current[tag_ids[tag]], score)
+            scores[tag] = score
+        TagTrendRepository.save_scores({tag_ids[tag]: score for tag, score in scores.items()})
+        transaction.on_commit(lambda: TrendingTagService.merge_top(scores), robust=True)
+
+    @staticmethod
+    def merge_top(scores: dict) -> None:
+        top = cache.get(TrendingTagService.CACHE_KEY)
+        if top is None:
+            return
+        top = [entry for entry in top if entry[1] not in scores] + [[score, tag] for tag, score in scores.items()]
+        top.sort(key=lambda entry: -entry[0])
+        cache.set(TrendingTagService.CACHE_KEY, top[:TRENDING_TAGS_SIZE], TrendingTagService.CACHE_TIMEOUT)
+
+    @staticmethod
+    def get_trending() -> list:
+        top = cache.get(TrendingTagService.CACHE_KEY)
+        if top is None:
+            top = TagTrendRepository.get_top(TRENDING_TAGS_SIZE)
+            cache.set(TrendingTagService.CACHE_KEY, top, TrendingTagService.CACHE_TIMEOUT)
+        now = TrendingTagService.get_weight(timezone.now())
+        return [{'tag': tag, 'score': exp(score - now)} for score, tag in top]
+
+
+class SearchService:
+
+    @staticmethod
+    def build_match(query: str) -> str:
+        terms = [term.strip('#') for term in query.split()]
+        return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms if term)
+
+    @staticmethod
+    def search(query: str, cursor: str = None, per_page: int = POSTS_PER_PAGE) -> CursorPage:
+        match = SearchService.build_match(query)
+        if not match:
+            return CursorPage(object_list=[])
+        offset = decode_offset(cursor)
+        post_ids = PostSearchRepository.search(match=match, offset=offset, limit=per_page + 1)
+        posts = PostRepository.get_posts_by_ids(post_ids[:per_page])
+        return get_offset_page(object_list=[posts[post_id] for post_id in post_ids[:per_page] if post_id in posts],
+                               offset=offset, has_next=len(post_ids) > per_page, per_page=per_page)
+
+    @staticmethod
+    def rebuild_index(batch_size: int = 1000) -> int:
+        return PostSearchRepository.rebuild(batch_size=batch_size)
+
 
 class LikeService:
 
     @staticmethod
     def like(post_id: int, user_id: int) -> None:
-        LikeRepository.add(post_id=post_id, user_id=user_id)
+        with transaction.atomic():
+            LikeRepository.add(post_id=post_id, user_id=user_id)
+            PostRepository.change_like_count(post_id=post_id, delta=1)
+            UserStatsRepository.change(user_id=user_id, version=1)
+
+    @staticmethod
+    def toggle(post_id: int, user_id: int) -> tuple:
+        with transaction.atomic():
+            if LikeRepository.delete(post_id=post_id, user_id=user_id):
+                liked, delta = False, -1
+            else:
+                liked = True
+                delta = 1 if LikeRepository.add_if_missing(post_id=post_id, user_id=user_id) else 0
+            if not delta:
+                return liked, PostRepository.get_like_count(post_id=post_id)
+            like_count = PostRepository.change_like_count(post_id=post_id, delta=delta)
+            UserStatsRepository.change(user_id=user_id, version=1)
+            transaction.on_commit(lambda: EventService.publish_like(post_id=post_id, delta=delta,
+                                                                    like_count=like_count), robust=True)
+            return liked, like_count
 
     @staticmethod
     def check_like(post_id: int, user_id: int) -> bool:
         return LikeRepository.check_like(post_id=post_id, user_id=user_id)
 
+    @staticmethod
+    def get_liked_post_ids(user_id: int, posts) -> set:
+        if user_id is None:
+            return set()
+        post_ids = [PostRepository.get_id(post) for post in posts]
+        return LikeRepository.get_liked_post_ids(user_id=user_id, post_ids=post_ids) if post_ids else set()
+
     @staticmethod
     def unlike(post_id: int, user_id: int) -> None:
-        LikeRepository.delete(post_id=post_id, user_id=user_id)
+        with transaction.atomic():
+            deleted = LikeRepository.delete(post_id=post_id, user_id=user_id)
+            if deleted:
+                PostRepository.change_like_count(post_id=post_id, delta=-deleted)
+                UserStatsRepository.change(user_id=user_id, version=1)
 
 
 class ImageService:
 
+    @staticmethod
+    def upload_many(images: list) -> list:
+        with ThreadPoolExecutor(max_workers=min(IMAGE_UPLOAD_WORKERS, len(images))) as executor:
+            futures = [executor.submit(ImageRepository.upload, image) for image in images]
+        names, errors = [], []
+        for future in futures:
+            try:
+                names.append(future.result())
+            except Exception as error:
+                errors.append(error)
+        if errors:
+            ImageRepository.delete_files(names)
+            raise errors[0]
+        return names
+
     @staticmethod
     def add(image: InMemoryUploadedFile, post: Post) -> None:
         ImageRepository.add(image=image, post=post)
+        PostRepository.bump_version(post_id=post.pk)
+
+
+class ThumbnailService:
+    executor = None
+    scheduler = None
+
+    @staticmethod
+    def get_executor() -> ProcessPoolExecutor:
+        if ThumbnailService.executor is None:
+            ThumbnailService.executor = ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+        return ThumbnailService.executor
+
+    @staticmethod
+    def get_scheduler() -> ThreadPoolExecutor:
+        if ThumbnailService.scheduler is None:
+            ThumbnailService.scheduler = ThreadPoolExecutor(max_workers=1, thread_name_prefix='thumbnails')
+        return ThumbnailService.scheduler
+
+    @staticmethod
+    def schedule_renditions(make, ids: list) -> None:
+        if not settings.THUMBNAIL_BACKGROUND:
+            ThumbnailService.run_renditions(make, ids)
+            return
+
+        def run():
+            try:
+                ThumbnailService.run_renditions(make, ids)
+            finally:
+                close_old_connections()
+        ThumbnailService.get_scheduler().submit(run)
+
+    @staticmethod
+    def run_renditions(make, ids: list) -> None:
+        try:
+            make(ids)
+        except Exception:
+            logger.exception('Failed to make renditions for %s', ids)
+
+    @staticmethod
+    def save_renditions(path: str, renditions: dict, storage) -> dict:
+        saved = {}
+        for rendition, value in renditions.items():
+            if isinstance(value, dict):
+                saved[rendition] = ThumbnailService.save_renditions(path, value, storage)
+                continue
+            data, image_format = value
+            key = get_rendition_key(path, rendition, image_format)
+            storage.delete(key)
+            saved[rendition] = storage.save(key, ContentFile(data))
+        return saved
+
+    @staticmethod
+    def render(paths: list, storage, formats: tuple = ()) -> list:
+        futures = []
+        for path in paths:
+            with storage.open(path) as file:
+                futures.append(ThumbnailService.get_executor().submit(make_renditions, file.read(), is_avatar(path),
+                                                                      formats=formats))
+
+        renditions = []
+        for path, future in zip(paths, futures):
+            try:
+                result = future.result()
+            except Exception:
+                renditions.append(None)
+                continue
+            renditions.append(ThumbnailService.save_renditions(path, result, storage))
+        return renditions
+
+    @staticmethod
+    def make_image_renditions(image_ids: list) -> int:
+        images = ImageRepository.get_paths(image_ids)
+        renditions = ThumbnailService.render([path for _, path, _ in images], storage=ImageRepository.get_storage(),
+                                             formats=ALTERNATE_FORMATS)
+        done = {image_id: value for (image_id, _, _), value in zip(images, renditions) if value is not None}
+        with transaction.atomic():
+            ImageRepository.set_renditions(done)
+            PostRepository.bump_versions(post_ids=list({post_id for image_id, _, post_id in images if image_id in done}))
+        return len(done)
+
+    @staticmethod
+    def apply_thumbnails(operations: list) -> list:
+        image_paths, avatar_paths = {}, {}
+        for operation in operations:
+            if operation['thumbnail']:
+                paths = avatar_paths if is_avatar(operation['original']) else image_paths
+                paths[operation['original']] = operation['thumbnail']
+
+        with transaction.atomic():
+            if image_paths:
+                PostRepository.bump_image_versions(image_paths=list(image_paths))
+            found = ImageRepository.update_many(image_paths) + UserRepository.update_avatars(avatar_paths)
+            if avatar_paths:
+                UserStatsRepository.bump_avatar_versions(avatar_paths=list(avatar_paths.values()))
+
+        results = []
+        for operation in operations:
+            if not operation['thumbnail']:
+                status = 'invalid'
+            elif found[operation['original']]:
+                status = 'completed'
+            else:
+                status = 'not_found'
+            results.append({'original': operation['original'], 'status': status})
+        return results
+
+    @staticmethod
+    def make_avatar_renditions(user_ids: list) -> int:
+        users = UserRepository.get_avatar_paths(user_ids)
+        renditions = ThumbnailService.render([path for _, path in users], storage=UserRepository.get_avatar_storage())
+        done = {user_id: value for (user_id, _), value in zip(users, renditions) if value is not None}
+        with transaction.atomic():
+            UserRepository.set_renditions(done)
+            UserStatsRepository.bump_versions(user_ids=list(done))
+        return len(done)
+
+
+class EventService:
+
+    @staticmethod
+    def publish_like(post_id: int, delta: int, like_count: int) -> None:
+        get_broker().publish(get_post_channel(post_id),
+                             {'type': LIKE, 'post_id': post_id, 'delta': delta, 'like_count': like_count})
+
+    @staticmethod
+    def publish_post(post_id: int, author_id: int) -> None:
+        get_broker().publish(get_author_channel(author_id), {'type': NEW_POSTS, 'post_id': post_id})
 
     @staticmethod
-    def update(current_path: str, new_path: str) -> None:
-        return ImageRepository.update(current_path=current_path, new_path=new_path)
+    def get_channels(user_id: int, post_ids: list, timeline: bool) -> list:
+        channels = [get_post_channel(post_id) for post_id in post_ids]
+        if timeline:
+            author_ids = AuthorFollowerRepository.get_followee_ids(follower_id=user_id) + [user_id]
+            channels.extend(get_author_channel(author_id) for author_id in author_ids)
+        return channels
+
+
+class VersionService:
+
+    @staticmethod
+    def bump_user(user_id: int) -> None:
+        UserStatsRepository.change(user_id=user_id, version=1)
+
+    @staticmethod
+    def get_feed_state(viewer_id: Optional[int], cursor: str = None) -> dict:
+        trending = TrendingTagService.get_trending()
+        page = PostService.get_feed_versions(viewer_id, cursor=cursor)
+        versions = UserStatsRepository.get_versions([viewer_id, *{values['user_id'] for values in page}])
+        validator = (viewer_id, versions.get(viewer_id, 0), VersionService.get_page_versions(page, versions),
+                     [tag['tag'] for tag in trending])
+        return {'validator': validator, 'page': page, 'trending': trending}
+
+    @staticmethod
+    def get_profile_state(user_id: int, viewer_id: int, cursor: str = None) -> dict:
+        page = PostService.get_profile_versions(user_id, cursor=cursor)
+        versions = UserStatsRepository.get_versions([user_id, viewer_id])
+        validator = (user_id, versions.get(user_id, 0), viewer_id, versions.get(viewer_id, 0),
+                     VersionService.get_page_versions(page, versions))
+        return {'validator': validator, 'page': page}
+
+    @staticmethod
+    def get_page_versions(page: CursorPage, author_versions: dict) -> list:
+        return [(values['id'], values['version'], author_versions.get(values['user_id'], 0)) for values in page]
+
+    @staticmethod
+    def get_like_validator(post_id: int, viewer_id: Optional[int]) -> Optional[tuple]:
+        version = PostRepository.get_version(post_id)
+        return None if version is None else (post_id, version, viewer_id)
 
 
 class AuthorFollowerService:
 
     @staticmethod
     def follow(author_id: int, follower_id: int) -> None:
-        AuthorFollowerRepository.add(author_id=author_id, follower_id=follower_id)
+        with transaction.atomic():
+            AuthorFollowerRepository.add(author_id=author_id, follower_id=follower_id)
+            UserStatsRepository.change(user_id=author_id, followers=1, version=1)
+            UserStatsRepository.change(user_id=follower_id, followees=1, version=1)
+            TimelineService.follow(author_id=author_id, follower_id=follower_id)
 
     @staticmethod
     def unfollow(author_id: int, follower_id: int) -> None:
-        AuthorFollowerRepository.delete(author_id=author_id, follower_id=follower_id)
+        with transaction.atomic():
+            if AuthorFollowerRepository.delete(author_id=author_id, follower_id=follower_id):
+                UserStatsRepository.change(user_id=author_id, followers=-1, version=1)
+                UserStatsRepository.change(user_id=follower_id, followees=-1, version=1)
+                TimelineService.unfollow(author_id=author_id, follower_id=follower_id)
 
     @staticmethod
     def is_following(author_id: int, follower_id: int) -> bool:
@@ -76,14 +483,89 @@ class AuthorFollowerService:
 
     @staticmethod
     def get_all_stats(author_id: int, follower_id: int) -> dict:
-        author_follower_data = AuthorFollowerRepository.get_all_stats(user_id=author_id)
-        authors_counter = Counter(author for author, _ in author_follower_data)
-        followers_counter = Counter(follower for _, follower in author_follower_data)
-        return {'followers': authors_counter[author_id],
-                'followees': followers_counter[author_id],
-                'is_following': (author_id, follower_id) in author_follower_data
-                }
+        stats = UserStatsRepository.get(user_id=author_id)
+        stats['is_following'] = AuthorFollowerRepository.is_following(author_id=author_id, follower_id=follower_id)
+        return stats
 
     @staticmethod
     def get_followers_stats(author_id: int) -> int:
-        return AuthorFollowerRepository.get_followers_stats(author_id=author_id)
+        return UserStatsRepository.get(user_id=author_id)['followers']
+
+    @staticmethod
+    def repair_stats(batch_size: int = 1000) -> int:
+        repaired = 0
+        for user_ids in UserStatsRepository.get_user_id_batches(batch_size=batch_size):
+            repaired += UserStatsRepository.repair(user_ids=user_ids)
+        return repaired
+
+
+class ApiService:
+
+    @staticmethod
+    def get_urls(renditions: dict, storage) -> dict:
+        return {rendition: ApiService.get_urls(value, storage) if isinstance(value, dict) else storage.url(value)
+                for rendition, value in renditions.items()}
+
+    @staticmethod
+    def serialize_posts(rows: list, viewer_id: Optional[int]) -> list:
+        post_ids = [row['id'] for row in rows]
+        if not post_ids:
+            return []
+        images = ImageRepository.get_by_post_ids(post_ids)
+        tags = PostTagRepository.get_by_post_ids(post_ids)
+        liked_post_ids = LikeRepository.get_liked_post_ids(user_id=viewer_id, post_ids=post_ids) if viewer_id else set()
+        image_storage, avatar_storage = ImageRepository.get_storage(), UserRepository.get_avatar_storage()
+        return [{
+            'id': row['id'],
+            'body': row['body'],
+            'created': row['datetime_created'],
+            'like_count': row['like_count'],
+            'liked': row['id'] in liked_post_ids,
+            'author': {
+                'id': row['user_id'],
+                'name': " ".join([row['user__first_name'], row['user__last_name']]),
+                'avatar': avatar_storage.url(row['user__avatar']) if row['user__avatar'] else None,
+            } if viewer_id else None,
+            'tags': tags[row['id']],
+            'images': [{'url': image_storage.url(path), 'renditions': ApiService.get_urls(renditions, image_storage)}
+                       for path, renditions in images[row['id']]],
+        } for row in rows]
+
+    @staticmethod
+    def serialize_page(page: CursorPage, viewer_id: Optional[int]) -> dict:
+        return {
+            'posts': ApiService.serialize_posts(page.object_list, viewer_id=viewer_id),
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        }
+
+    @staticmethod
+    def get_feed(viewer_id: Optional[int], cursor: str = None) -> dict:
+        if viewer_id:
+            posts = PostRepository.get_values(PostService.get_feed_posts(viewer_id),
+                                              'timeline_created', 'timeline_post_id')
+            page = get_cursor_page(posts=posts, cursor=cursor,
+                                   created_field='timeline_created', id_field='timeline_post_id')
+        else:
+            page = get_cursor_page(posts=PostRepository.get_values(PostService.get_all_posts()), cursor=cursor)
+        return ApiService.serialize_page(page, viewer_id=viewer_id)
+
+    @staticmethod
+    def get_profile(user_id: int, viewer_id: Optional[int], cursor: str = None) -> dict:
+        user = UserRepository.get_values(user_id=user_id)
+        stats = AuthorFollowerService.get_all_stats(author_id=user_id, follower_id=viewer_id)
+        page = get_cursor_page(posts=PostRepository.get_values(PostService.get_profile_posts(user_id)), cursor=cursor)
+        return {
+            'user': {
+                'id': user['id'],
+                'name': " ".join([user['first_name'], user['last_name']]),
+                'bio': user['bio'],
+                'avatar': UserRepository.get_avatar_storage().url(user['avatar']) if user['avatar'] else None,
+                **stats,
+            },
+            **ApiService.serialize_page(page, viewer_id=viewer_id),
+        }
+
+    @staticmethod
+    def get_post(post_id: int, viewer_id: Optional[int]) -> dict:
+        return ApiService.serialize_posts([PostRepository.get_post_values(post_id)], viewer_id=viewer_id)[0]
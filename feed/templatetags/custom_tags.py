@@ -1,16 +1,13 @@
 from django import template
+from django.core.files.storage import default_storage
 from django.db.models.query import QuerySet
-from django.core.paginator import Page
+from feed.helpers import CursorPage
+from djangogramm.aws_resource.thumbnails import RENDITION_SIZES, ALTERNATE_FORMATS
 
 
 register = template.Library()
 
 
-@register.filter
-def get_likes(queryset: QuerySet) -> list:
-    return [like.user.pk for like in queryset]
-
-
 @register.filter
 def get_tags(queryset: QuerySet) -> str:
     return " ".join([t.tag.tag for t in queryset])
@@ -18,12 +15,12 @@ def get_tags(queryset: QuerySet) -> str:
 
 @register.filter
 def is_page(page_obj) -> bool:
-    return isinstance(page_obj, Page)
+    return isinstance(page_obj, CursorPage)
 
 
 @register.filter
 def get_fullname(page_obj) -> str:
-    if isinstance(page_obj, Page):
+    if isinstance(page_obj, CursorPage):
         fullname = " ".join([page_obj[0].user.first_name, page_obj[0].user.last_name])
     else:
         fullname = " ".join([page_obj.first_name, page_obj.last_name])
@@ -32,7 +29,7 @@ def get_fullname(page_obj) -> str:
 
 @register.filter
 def get_bio(page_obj) -> str:
-    if isinstance(page_obj, Page):
+    if isinstance(page_obj, CursorPage):
         bio = page_obj[0].user.bio
     else:
         bio = page_obj.bio
@@ -41,7 +38,7 @@ def get_bio(page_obj) -> str:
 
 @register.filter
 def get_avatar(page_obj) -> str:
-    if isinstance(page_obj, Page):
+    if isinstance(page_obj, CursorPage):
         avatar = page_obj[0].user.avatar.url
     else:
         avatar = page_obj.avatar.url
@@ -50,7 +47,28 @@ def get_avatar(page_obj) -> str:
 
 @register.filter
 def check_avatar(page_obj) -> str:
-    if isinstance(page_obj, Page):
+    if isinstance(page_obj, CursorPage):
         return page_obj[0].user.avatar
     else:
         return page_obj.avatar
+
+
+@register.filter
+def srcset(renditions: dict) -> str:
+    widths = {rendition: RENDITION_SIZES[rendition][0] for rendition in renditions if rendition in RENDITION_SIZES}
+    return ", ".join([f"{default_storage.url(renditions[rendition])} {width}w"
+                      for rendition, width in sorted(widths.items(), key=lambda item: item[1])])
+
+
+@register.filter
+def get_sources(renditions: dict) -> list:
+    return [(f"image/{image_format}", srcset(renditions[image_format]))
+            for image_format in ALTERNATE_FORMATS if renditions.get(image_format)]
+
+
+@register.filter
+def get_avatar_srcset(page_obj) -> str:
+    if isinstance(page_obj, CursorPage):
+        return srcset(page_obj[0].user.renditions)
+    else:
+        return srcset(page_obj.renditions)
@@ -1,10 +1,39 @@
+import asyncio
 import json
+import os
+import sqlite3
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from io import BytesIO, StringIO
+from django.core.management import call_command
 from django.shortcuts import reverse
-from django.test import TestCase, Client
-from djangogramm.test_helpers import create_mock_image, allowed_image_file_size, not_allowed_image_file_size
-from djangogramm.settings import AWS_WEBHOOK_TOKEN
+from datetime import timedelta
+from threading import Barrier, Event, get_ident
+from asgiref.sync import async_to_sync
+from PIL import Image as PillowImage
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection, connections
+from django.db.utils import load_backend, DEFAULT_DB_ALIAS
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from feed.async_views import AsyncEvents, run_read
+from feed.events import (EventBroker, RelayBroker, start_relay, get_post_channel, get_author_channel, LIKE,
+                         NEW_POSTS)
+from djangogramm.test_helpers import (create_mock_image, allowed_image_file_size, not_allowed_image_file_size,
+                                      first_user_credentials, second_user_credentials)
+from djangogramm.aws_resource.thumbnails import (make_renditions, open_image, spool, ThumbnailBatcher, ImageTooLarge,
+                                                 convert_mode, image_handler, ALTERNATE_FORMATS)
+from djangogramm.asgi_settings import ROOT_URLCONF as ASGI_URLCONF, MIDDLEWARE as ASGI_MIDDLEWARE
+from djangogramm.production_settings import DATABASES as PRODUCTION_DATABASES
+from djangogramm.settings import AWS_WEBHOOK_TOKEN, THUMBNAIL_WEBHOOK_BATCH_SIZE, TRENDING_TAGS_HALF_LIFE_HOURS
 from feed.forms import ImageForm, ImageFormSet, PostForm
-from feed.models import Image
+from feed.models import Image, Like, Post, UserStats, Tag, PostTag, Timeline, TagTrend
+from feed.repository import ImageRepository, LikeRepository
+from feed.seeding import seed_dataset
+from feed.services import (PostService, AuthorFollowerService, TrendingTagService, LikeService, EventService,
+                           ThumbnailService)
 from users.models import CustomUser
 
 
@@ -207,3 +236,735 @@ class TestWebhook(TestCase):
         response = self.client.post(self.webhook_url, data={}, content_type="application/json")
         self.assertEqual(response.content, b'{"message": "Token is invalid"}')
         self.assertEqual(response.status_code, 400)
+
+    def test_webhook_make_thumbnails_batch(self):
+        post_ids = list(Post.objects.filter(image__image=self.image_path).values_list('id', flat=True))
+        operations = [
+            {'original': self.image_path, 'thumbnail': 'thumbnails/' + self.image_path},
+            {'original': self.avatar_path, 'thumbnail': 'thumbnails/' + self.avatar_path},
+            {'original': 'images/some_image', 'thumbnail': 'thumbnails/images/some_image'},
+            {'original': 'images/other_image', 'thumbnail': ''},
+        ]
+        data = {'token': AWS_WEBHOOK_TOKEN, 'make_thumbnails': operations}
+        response = self.client.post(self.webhook_url, data=json.dumps(data), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.json()['results']],
+                         ['completed', 'completed', 'not_found', 'invalid'])
+        self.assertFalse(Image.objects.filter(image=self.image_path).exists())
+        self.assertEqual(str(Image.objects.get(pk=1).image), 'thumbnails/' + self.image_path)
+        self.assertEqual(str(CustomUser.objects.get(pk=1).avatar), 'thumbnails/' + self.avatar_path)
+        self.assertEqual(set(Post.objects.filter(version=1).values_list('id', flat=True)), set(post_ids))
+
+    def test_webhook_make_thumbnails_invalid_batch(self):
+        for operations in [{'original': self.image_path}, [{'original': 1, 'thumbnail': 'x'}],
+                           [{'original': self.image_path, 'thumbnail': 'x'}] * (THUMBNAIL_WEBHOOK_BATCH_SIZE + 1)]:
+            data = {'token': AWS_WEBHOOK_TOKEN, 'make_thumbnails': operations}
+            response = self.client.post(self.webhook_url, data=json.dumps(data), content_type="application/json")
+            self.assertEqual(response.content, b'{"message": "Operations are invalid"}')
+            self.assertEqual(response.status_code, 400)
+
+    def test_thumbnail_batcher_flushes_full_batches(self):
+        sent = []
+        batcher = ThumbnailBatcher(send=sent.append, batch_size=2)
+        for number in range(3):
+            batcher.add(original=f'images/{number}.jpg', thumbnail=f'thumbnails/images/{number}.jpg')
+        self.assertEqual([len(batch) for batch in sent], [2])
+        batcher.flush()
+        batcher.flush()
+        self.assertEqual([len(batch) for batch in sent], [2, 1])
+
+
+class TestReconcileLikeCounts(TestCase):
+
+    def test_reconcile_like_counts(self):
+        Post.objects.filter(body='Poland!').update(like_count=10)
+        Post.objects.filter(body='Italy!').update(like_count=0)
+        out = StringIO()
+        call_command('reconcile_like_counts', stdout=out)
+        self.assertEqual(Post.objects.get(body='Poland!').like_count, 2)
+        self.assertEqual(Post.objects.get(body='Italy!').like_count, 1)
+        self.assertIn('2 posts updated', out.getvalue())
+
+
+class TestLikeToggle(TestCase):
+
+    def test_toggle_returns_updated_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(LikeService.toggle(post_id=6, user_id=3), (True, 3))
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT "feed_post"')])
+        self.assertEqual(LikeService.toggle(post_id=6, user_id=3), (False, 2))
+        self.assertEqual(Post.objects.get(pk=6).like_count, 2)
+
+    def test_add_if_missing_existing_like(self):
+        self.assertFalse(LikeRepository.add_if_missing(post_id=6, user_id=1))
+
+    def test_toggle_missing_post(self):
+        with self.assertRaises(Post.DoesNotExist):
+            LikeService.toggle(post_id=1000, user_id=1)
+        self.assertFalse(Like.objects.filter(post_id=1000).exists())
+
+
+class TestTimelineFanOut(TestCase):
+
+    @patch('feed.services.TIMELINE_FANOUT_RESUME_FOLLOWERS', 0)
+    @patch('feed.services.TIMELINE_FANOUT_MAX_FOLLOWERS', 1)
+    def test_pulled_author_resumed_below_lower_threshold(self):
+        AuthorFollowerService.follow(author_id=3, follower_id=2)
+        self.assertTrue(UserStats.objects.get(user_id=3).pulled)
+        post = PostService.create_post(user_id=3, body='pulled', tags=[])
+
+        AuthorFollowerService.unfollow(author_id=3, follower_id=2)
+        call_command('resume_timeline_fanout', stdout=StringIO())
+        self.assertTrue(UserStats.objects.get(user_id=3).pulled)
+        self.assertFalse(Timeline.objects.filter(user_id=1, post=post).exists())
+
+        with patch('feed.services.TIMELINE_FANOUT_RESUME_FOLLOWERS', 1):
+            call_command('resume_timeline_fanout', batch_size=1, stdout=StringIO())
+        self.assertFalse(UserStats.objects.get(user_id=3).pulled)
+        self.assertTrue(Timeline.objects.filter(user_id=1, post=post).exists())
+
+
+class TestRepairUserStats(TestCase):
+
+    def test_repair_user_stats(self):
+        UserStats.objects.filter(user_id=1).update(followers=100, posts=0)
+        UserStats.objects.filter(user_id=3).delete()
+        out = StringIO()
+        call_command('repair_user_stats', stdout=out)
+        self.assertEqual(UserStats.objects.filter(user_id=1).values('followers', 'followees', 'posts').get(),
+                         {'followers': 2, 'followees': 2, 'posts': 2})
+        self.assertEqual(UserStats.objects.filter(user_id=3).values('followers', 'followees', 'posts').get(),
+                         {'followers': 1, 'followees': 2, 'posts': 2})
+        self.assertIn('2 users updated', out.getvalue())
+
+
+class TestSeed(TestCase):
+
+    def test_seed_keeps_denormalized_data_consistent(self):
+        out = StringIO()
+        call_command('seed', users=50, followees=5, posts=3, likes=2, tags=10, images=2, seed=1, batch_size=20,
+                     stdout=out)
+        self.assertIn('50 users', out.getvalue())
+        seeded = Post.objects.filter(user__email__startswith='seed-')
+        self.assertTrue(seeded.exists())
+        self.assertEqual(AuthorFollowerService.repair_stats(), 0)
+        self.assertEqual(PostService.reconcile_like_counts(), 0)
+        self.assertTrue(Image.objects.filter(post__in=seeded).exists())
+
+        for post in seeded[:10]:
+            expected = {post.user_id} | set(post.user.author.values_list('follower_id', flat=True))
+            self.assertEqual(set(Timeline.objects.filter(post=post).values_list('user_id', flat=True)), expected)
+
+    def test_seed_is_reproducible(self):
+        first = seed_dataset(users=30, followees_per_user=4, posts_per_user=2, likes_per_post=2, tags=5,
+                             random_seed=7, label='first')
+        second = seed_dataset(users=30, followees_per_user=4, posts_per_user=2, likes_per_post=2, tags=5,
+                              random_seed=7, label='second')
+        for key in ('follows', 'posts', 'likes', 'post_tags'):
+            self.assertEqual(first[key], second[key])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestTrendingTags(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_backfilled_trends(self):
+        trending = TrendingTagService.get_trending()
+        self.assertEqual(trending[0]['tag'], '#traveling')
+        self.assertEqual(len(trending), 10)
+
+    def test_new_posts_merged_into_cached_top(self):
+        TrendingTagService.get_trending()
+        for number in range(5):
+            with self.captureOnCommitCallbacks(execute=True):
+                PostService.create_post(user_id=1, body=f'post {number}', tags=['#new'])
+        with self.assertNumQueries(0):
+            trending = TrendingTagService.get_trending()
+        self.assertEqual(trending[0]['tag'], '#new')
+        self.assertAlmostEqual(trending[0]['score'], 5, places=2)
+        cache.clear()
+        self.assertEqual([trend['tag'] for trend in TrendingTagService.get_trending()],
+                         [trend['tag'] for trend in trending])
+
+    def test_scores_decay_with_half_life(self):
+        tag_ids = {tag.tag: tag.pk for tag in Tag.objects.bulk_create([Tag(tag='#old'), Tag(tag='#fresh')])}
+        now = timezone.now()
+        TrendingTagService.record(tag_counts={'#old': 2}, tag_ids=tag_ids,
+                                  moment=now - timedelta(hours=TRENDING_TAGS_HALF_LIFE_HOURS))
+        TrendingTagService.record(tag_counts={'#fresh': 1}, tag_ids=tag_ids, moment=now)
+        scores = TagTrend.objects.filter(tag_id__in=tag_ids.values()).values_list('score', flat=True)
+        self.assertAlmostEqual(*scores)
+
+
+class TestCreatePostTags(TestCase):
+
+    def test_tags_resolved_in_bulk(self):
+        with self.assertNumQueries(5):
+            PostService.link_tags({1: ['#iceland', '#new'], 2: ['#new', '#other']}, bump_versions=False)
+        self.assertEqual(set(PostTag.objects.filter(post_id=2).values_list('tag__tag', flat=True)),
+                         {'#traveling', '#vacation', '#new', '#other'})
+        self.assertEqual(Tag.objects.filter(tag='#new').count(), 1)
+
+    def test_create_post_rolled_back_on_failure(self):
+        posts_amount = Post.objects.count()
+        stored_images = len(default_storage.listdir('images')[1])
+        image = create_mock_image(target_file_size=allowed_image_file_size, image_size=(300, 300))
+        with patch('feed.services.ImageRepository.add_many', side_effect=OSError):
+            with self.assertRaises(OSError):
+                PostService.create_post(user_id=1, body='broken post', tags=['#broken'], images=[image])
+        self.assertEqual(len(default_storage.listdir('images')[1]), stored_images)
+        self.assertEqual(Post.objects.count(), posts_amount)
+        self.assertFalse(Tag.objects.filter(tag='#broken').exists())
+        self.assertEqual(UserStats.objects.get(user_id=1).posts, 2)
+
+    def test_create_post_kept_when_commit_hook_fails(self):
+        image = create_mock_image(target_file_size=allowed_image_file_size, image_size=(300, 300))
+        with patch('feed.services.TrendingTagService.merge_top', side_effect=OSError), \
+                self.assertLogs('django.test', level='ERROR'), self.captureOnCommitCallbacks(execute=True):
+            post = PostService.create_post(user_id=1, body='kept post', tags=['#kept'], images=[image])
+        self.assertTrue(default_storage.exists(post.image_set.get().image.name))
+        self.assertTrue(Post.objects.filter(body='kept post').exists())
+
+
+class TestParallelImageUploads(TestCase):
+
+    def create_images(self, amount: int) -> list:
+        return [create_mock_image(target_file_size=allowed_image_file_size, image_size=(300, 300), name=f'{number}.jpg')
+                for number in range(amount)]
+
+    def test_uploads_run_concurrently(self):
+        barrier = Barrier(3, timeout=5)
+        upload_image = ImageRepository.upload
+
+        def upload(image):
+            barrier.wait()
+            return upload_image(image)
+
+        with patch('feed.services.ImageRepository.upload', side_effect=upload):
+            post = PostService.create_post(user_id=1, body='three images', tags=[], images=self.create_images(3))
+        names = list(post.image_set.values_list('image', flat=True))
+        self.assertEqual(len(names), 3)
+        self.assertTrue(all(default_storage.exists(name) for name in names))
+
+    def test_partial_failure_removes_uploaded_files(self):
+        stored_images = len(default_storage.listdir('images')[1])
+        upload_image = ImageRepository.upload
+
+        def upload(image):
+            if image.name == '1.jpg':
+                raise OSError
+            return upload_image(image)
+
+        with patch('feed.services.ImageRepository.upload', side_effect=upload):
+            with self.assertRaises(OSError):
+                PostService.create_post(user_id=1, body='broken upload', tags=[], images=self.create_images(3))
+        self.assertEqual(len(default_storage.listdir('images')[1]), stored_images)
+        self.assertFalse(Post.objects.filter(body='broken upload').exists())
+
+
+class TestThumbnails(TestCase):
+
+    def create_image(self, mode: str = 'RGB', size: tuple = (1000, 500)) -> bytes:
+        buffer = BytesIO()
+        PillowImage.new(mode, size).save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def test_make_renditions(self):
+        renditions = make_renditions(self.create_image(), avatar=False)
+        self.assertEqual({name: PillowImage.open(BytesIO(data)).size for name, (data, _) in renditions.items()},
+                         {'feed': (600, 800), 'mobile': (300, 400)})
+        renditions = make_renditions(self.create_image(mode='L'), avatar=False)
+        self.assertEqual({name: PillowImage.open(BytesIO(data)).size for name, (data, _) in renditions.items()},
+                         {'feed': (600, 800), 'mobile': (300, 400)})
+        self.assertEqual(image_handler(convert_mode(PillowImage.new('LA', (100, 100)))).mode, 'RGBA')
+        renditions = make_renditions(self.create_image(mode='P', size=(200, 200)), avatar=True)
+        self.assertEqual({name: PillowImage.open(BytesIO(data)).size for name, (data, _) in renditions.items()},
+                         {'avatar_32': (32, 32), 'avatar_64': (64, 64), 'avatar_100': (100, 100)})
+
+    def test_renditions_made_after_upload(self):
+        image = create_mock_image(target_file_size=allowed_image_file_size, image_size=(300, 300))
+        with patch('feed.services.LOCAL_THUMBNAILS', True), self.captureOnCommitCallbacks(execute=True):
+            post = PostService.create_post(user_id=1, body='thumbnails', tags=[], images=[image])
+        renditions = post.image_set.get().renditions
+        self.assertEqual(set(renditions), {'feed', 'mobile', *ALTERNATE_FORMATS})
+        self.assertTrue(all(default_storage.exists(renditions[name]) for name in ('feed', 'mobile')))
+        self.assertEqual(Post.objects.get(pk=post.pk).version, 1)
+
+        client = Client()
+        client.login(**first_user_credentials)
+        response = client.get(reverse('profile', kwargs={'user_id': 1}))
+        self.assertContains(response, f'srcset="{default_storage.url(renditions["mobile"])} 300w, '
+                                      f'{default_storage.url(renditions["feed"])} 600w"')
+        for image_format in ALTERNATE_FORMATS:
+            sources = renditions[image_format]
+            self.assertTrue(sources['feed'].endswith(f'.{image_format}'))
+            self.assertContains(response, f'<source type="image/{image_format}" '
+                                          f'srcset="{default_storage.url(sources["mobile"])} 300w, '
+                                          f'{default_storage.url(sources["feed"])} 600w"')
+
+    def test_render_failure_keeps_post(self):
+        image = create_mock_image(target_file_size=allowed_image_file_size, image_size=(300, 300))
+        with patch('feed.services.LOCAL_THUMBNAILS', True), patch('feed.services.ThumbnailService.render',
+                                                                  side_effect=OSError), \
+                self.assertLogs('feed.services', level='ERROR'), self.captureOnCommitCallbacks(execute=True):
+            post = PostService.create_post(user_id=1, body='thumbnails', tags=[], images=[image])
+        self.assertTrue(default_storage.exists(post.image_set.get().image.name))
+        self.assertEqual(post.image_set.get().renditions, {})
+
+    @override_settings(THUMBNAIL_BACKGROUND=True)
+    def test_renditions_scheduled_in_background(self):
+        image = create_mock_image(target_file_size=allowed_image_file_size, image_size=(300, 300))
+        with patch('feed.services.LOCAL_THUMBNAILS', True), patch('feed.services.ThumbnailService.get_scheduler') as \
+                scheduler, patch('feed.services.ThumbnailService.render') as render, \
+                self.captureOnCommitCallbacks(execute=True):
+            PostService.create_post(user_id=1, body='thumbnails', tags=[], images=[image])
+        scheduler.return_value.submit.assert_called_once()
+        render.assert_not_called()
+
+    def test_make_alternate_format_renditions(self):
+        renditions = make_renditions(self.create_image(), avatar=False, formats=('webp',))
+        self.assertEqual(renditions['feed'][1], 'jpeg')
+        self.assertEqual({name: (PillowImage.open(BytesIO(data)).format, image_format)
+                          for name, (data, image_format) in renditions['webp'].items()},
+                         {'feed': ('WEBP', 'webp'), 'mobile': ('WEBP', 'webp')})
+
+    def test_compare_rendition_formats_command(self):
+        out = StringIO()
+        call_command('compare_rendition_formats', limit=2, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['images'], 2)
+        self.assertEqual(set(report['formats']), {'fallback', *ALTERNATE_FORMATS})
+        self.assertEqual(report['formats']['fallback']['ratio'], 1)
+
+    def test_large_image_decoded_at_reduced_size(self):
+        buffer = BytesIO()
+        PillowImage.new('RGB', (4000, 3000)).save(buffer, format='JPEG')
+        self.assertEqual(open_image(BytesIO(buffer.getvalue())).size, (4000, 3000))
+        self.assertEqual(open_image(BytesIO(buffer.getvalue()), size=(600, 800)).size, (2000, 1500))
+        renditions = make_renditions(buffer.getvalue(), avatar=False)
+        self.assertEqual(PillowImage.open(BytesIO(renditions['feed'][0])).size, (600, 800))
+
+    def test_image_over_pixel_limit_rejected(self):
+        with patch('djangogramm.aws_resource.thumbnails.MAX_IMAGE_PIXELS', 1000 * 500 - 1):
+            with self.assertRaises(ImageTooLarge):
+                make_renditions(self.create_image(), avatar=False)
+
+    def test_spool(self):
+        data = self.create_image()
+        with patch('djangogramm.aws_resource.thumbnails.SPOOL_MAX_SIZE', 10), spool(BytesIO(data)) as source:
+            self.assertEqual(open_image(source).size, (1000, 500))
+            source.seek(0)
+            self.assertEqual(source.read(), data)
+
+    def test_benchmark_thumbnails_command(self):
+        out = StringIO()
+        call_command('benchmark_thumbnails', megapixels=[1], repeat=1, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(len(report), 1)
+        self.assertEqual(set(report[0]['reduced']), {'cpu_ms', 'peak_rss_kb'})
+
+    def test_make_thumbnails_command(self):
+        out = StringIO()
+        call_command('make_thumbnails', stdout=out)
+        self.assertIn(f'Renditions made for {Image.objects.count()} images', out.getvalue())
+        self.assertFalse(Image.objects.filter(renditions={}).exists())
+
+
+class TestQueryPlans(TestCase):
+
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn('All hot queries use their indexes', out.getvalue())
+
+
+class TestBenchmarkViews(TestCase):
+
+    def test_benchmark_report(self):
+        out = StringIO()
+        call_command('benchmark_views', sizes=[10], followees=3, posts=2, likes=2, tags=5, requests=3, stdout=out)
+        dataset = json.loads(out.getvalue())['datasets'][0]
+        self.assertEqual(dataset['users'], 10)
+        self.assertGreater(dataset['posts'], 0)
+        self.assertEqual(set(dataset['views']), {'feed', 'profile', 'like', 'follow'})
+        self.assertGreater(dataset['views']['feed']['queries_max'], 0)
+        self.assertFalse(Post.objects.filter(body='Post 0').exists())
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_benchmark_leaves_shared_cache_untouched(self):
+        cache.clear()
+        call_command('benchmark_views', sizes=[10], followees=3, posts=2, likes=2, tags=5, requests=3,
+                     stdout=StringIO())
+        self.assertIsNone(cache.get(TrendingTagService.CACHE_KEY))
+        self.assertFalse(cache._cache)
+
+
+class TestProductionDatabase(TestCase):
+
+    def test_pragmas_and_immediate_transactions(self):
+        with TemporaryDirectory() as directory:
+            name = os.path.join(directory, 'production.sqlite3')
+            settings_dict = connections.configure_settings(
+                {DEFAULT_DB_ALIAS: {**PRODUCTION_DATABASES[DEFAULT_DB_ALIAS], 'NAME': name}})[DEFAULT_DB_ALIAS]
+            connection = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, 'production')
+            try:
+                with connection.cursor() as cursor:
+                    pragmas = {}
+                    for pragma in ('journal_mode', 'synchronous', 'busy_timeout'):
+                        cursor.execute(f'PRAGMA {pragma}')
+                        pragmas[pragma] = cursor.fetchone()[0]
+                self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 20000})
+
+                connection._start_transaction_under_autocommit()
+                other = sqlite3.connect(name, timeout=0)
+                with self.assertRaisesMessage(sqlite3.OperationalError, 'database is locked'):
+                    other.execute('BEGIN IMMEDIATE')
+                other.close()
+            finally:
+                connection.close()
+
+    def test_benchmark_sqlite_concurrency(self):
+        out = StringIO()
+        call_command('benchmark_sqlite_concurrency', threads=2, duration=0.2, posts=50, users=10, stdout=out)
+        profiles = json.loads(out.getvalue())['profiles']
+        self.assertEqual(set(profiles), {'default', 'production'})
+        self.assertGreater(profiles['production']['reads'] + profiles['production']['writes'], 0)
+
+
+class TestAsyncViews(TestCase):
+
+    def setUp(self):
+        self.client.login(**first_user_credentials)
+        self.async_client.login(**first_user_credentials)
+
+    def async_request(self, method: str, url: str, data: dict = None):
+        async def request():
+            return await getattr(self.async_client, method)(url, data)
+
+        with override_settings(ROOT_URLCONF=ASGI_URLCONF, MIDDLEWARE=ASGI_MIDDLEWARE):
+            return async_to_sync(request)()
+
+    def test_feed_and_profile_match_sync_views(self):
+        for url in (reverse('feed'), reverse('profile', kwargs={'user_id': 1}), reverse('profile', kwargs={'user_id': 3})):
+            expected, response = self.client.get(url), self.async_request('get', url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([p.pk for p in response.context['page_obj']], [p.pk for p in expected.context['page_obj']])
+            for key in ('liked_post_ids', 'followers', 'followees', 'is_following', 'posts_amount'):
+                self.assertEqual(response.context.get(key), expected.context.get(key))
+            self.assertEqual([tag['tag'] for tag in response.context.get('trending_tags', [])],
+                             [tag['tag'] for tag in expected.context.get('trending_tags', [])])
+
+    def test_profile_login_required(self):
+        self.client.logout()
+        self.async_client.logout()
+        url = reverse('profile', kwargs={'user_id': 1})
+        response = self.async_request('get', url)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, self.client.get(url).url)
+
+    def test_like_and_follow(self):
+        like_count = Post.objects.get(pk=6).like_count
+        response = self.async_request('post', reverse('like'), {'post_id': 6})
+        self.assertEqual(json.loads(response.content), {'post_id': 6, 'liked': False, 'like_count': like_count - 1})
+        self.assertEqual(self.async_request('post', reverse('like'), {'post_id': 'x'}).status_code, 400)
+
+        response = self.async_request('post', reverse('follow'), {'author_id': 3})
+        self.assertNotIn('Unfollow', json.loads(response.content)['button_html'])
+        self.assertFalse(AuthorFollowerService.is_following(author_id=3, follower_id=1))
+
+    @override_settings(ASYNC_CONCURRENT_READS=True)
+    def test_concurrent_reads_run_in_worker_threads(self):
+        self.assertNotEqual(async_to_sync(run_read)(get_ident), get_ident())
+
+    def test_benchmark_async_views(self):
+        out = StringIO()
+        call_command('benchmark_async_views', modes=['asgi'], users=10, followees=3, posts=2, likes=2, requests=4,
+                     concurrency=2, latency=0, stdout=out)
+        report = json.loads(out.getvalue())['modes']['asgi']
+        self.assertEqual(report['errors'], 0)
+        self.assertFalse(Post.objects.filter(body='Post 0').exists())
+
+
+class TestApi(TestCase):
+
+    def setUp(self):
+        self.client.login(**first_user_credentials)
+
+    def test_feed_matches_html_feed(self):
+        html_pages, api_pages = [], []
+        html_cursor = api_cursor = None
+        while True:
+            page_obj = self.client.get(reverse('feed'), {'cursor': html_cursor or ''}).context['page_obj']
+            html_pages.append([p.pk for p in page_obj])
+            data = self.client.get(reverse('api_feed'), {'cursor': api_cursor or ''}).json()
+            api_pages.append([post['id'] for post in data['posts']])
+            html_cursor, api_cursor = page_obj.next_cursor, data['next_cursor']
+            if not html_cursor:
+                break
+        self.assertEqual(api_pages, html_pages)
+        self.assertIsNone(api_cursor)
+
+    def test_feed_queries_and_fields(self):
+        with self.assertNumQueries(7):
+            data = self.client.get(reverse('api_feed')).json()
+        post = next(post for post in data['posts'] if post['id'] == 6)
+        self.assertEqual(set(post), {'id', 'body', 'created', 'like_count', 'liked', 'author', 'tags', 'images'})
+        self.assertEqual(post['author'], {'id': 3, 'name': 'Marie Curie', 'avatar': None})
+        self.assertEqual(post['tags'], ['#painting'])
+        self.assertTrue(post['liked'])
+
+    def test_profile(self):
+        data = self.client.get(reverse('api_profile', kwargs={'user_id': 3})).json()
+        self.assertEqual(data['user']['is_following'], True)
+        self.assertEqual(data['user']['posts'], len(data['posts']))
+        self.assertEqual({post['author']['id'] for post in data['posts']}, {3})
+        self.assertEqual(self.client.get(reverse('api_profile', kwargs={'user_id': 999})).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_profile', kwargs={'user_id': 3})).status_code, 401)
+
+    def test_post(self):
+        Image.objects.filter(post_id=6).update(renditions={'feed': 'thumbnails/images/feed/a.jpeg',
+                                                           'webp': {'feed': 'thumbnails/images/feed/a.webp'}})
+        data = self.client.get(reverse('api_post', kwargs={'post_id': 6})).json()
+        self.assertEqual(data['like_count'], Post.objects.get(pk=6).like_count)
+        self.assertEqual(data['images'][0]['renditions'], {'feed': default_storage.url('thumbnails/images/feed/a.jpeg'),
+                                                           'webp': {'feed': default_storage.url(
+                                                               'thumbnails/images/feed/a.webp')}})
+        self.client.logout()
+        data = self.client.get(reverse('api_post', kwargs={'post_id': 6})).json()
+        self.assertFalse(data['liked'])
+        self.assertIsNone(data['author'])
+        self.assertEqual(self.client.get(reverse('api_post', kwargs={'post_id': 999})).status_code, 404)
+
+
+class TestConditionalGet(TestCase):
+
+    def setUp(self):
+        self.client.login(**first_user_credentials)
+        self.feed_url = reverse('feed')
+        self.profile_url = reverse('profile', kwargs={'user_id': 3})
+        self.like_url = reverse('like') + '?post_id=6'
+
+    def get_etag(self, url: str) -> str:
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        return response['ETag']
+
+    def assertNotModified(self, url: str, etag: str, not_modified: bool = True):
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304 if not_modified else 200)
+
+    def test_feed_not_modified_before_page_queries(self):
+        etag = self.get_etag(self.feed_url)
+        with CaptureQueriesContext(connection) as not_modified:
+            self.assertNotModified(self.feed_url, etag)
+        with CaptureQueriesContext(connection) as modified:
+            self.assertNotModified(self.feed_url, '"stale"', not_modified=False)
+        self.assertLess(len(not_modified), len(modified) - 3)
+
+        LikeService.toggle(post_id=6, user_id=1)
+        self.assertNotModified(self.feed_url, etag, not_modified=False)
+        etag = self.get_etag(self.feed_url)
+        PostService.create_post(user_id=3, body='new', tags=[])
+        self.assertNotModified(self.feed_url, etag, not_modified=False)
+        etag = self.get_etag(self.feed_url)
+        self.assertNotModified(self.feed_url + '?cursor=x', etag, not_modified=False)
+
+    def test_feed_revalidated_on_post_changes(self):
+        author_version = UserStats.objects.get(user_id=3).version
+        etag = self.get_etag(self.feed_url)
+        LikeService.toggle(post_id=6, user_id=2)
+        self.assertEqual(UserStats.objects.get(user_id=3).version, author_version)
+        self.assertNotModified(self.feed_url, etag, not_modified=False)
+        etag = self.get_etag(self.feed_url)
+        PostService.link_tags({6: ['#new']})
+        self.assertNotModified(self.feed_url, etag, not_modified=False)
+        etag = self.get_etag(self.feed_url)
+        image = Image.objects.filter(post_id=6).first()
+        ThumbnailService.apply_thumbnails([{'original': image.image.name, 'thumbnail': 'images/thumbnail.jpg'}])
+        self.assertNotModified(self.feed_url, etag, not_modified=False)
+        self.assertEqual(UserStats.objects.get(user_id=3).version, author_version)
+
+    def test_feed_page_read_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertNotModified(self.feed_url, '"stale"', not_modified=False)
+        trending = [query for query in queries if TagTrend._meta.db_table in query['sql']]
+        timeline = [query for query in queries if Timeline._meta.db_table in query['sql']]
+        self.assertEqual((len(trending), len(timeline)), (1, 1))
+
+    def test_profile_versions(self):
+        etag = self.get_etag(self.profile_url)
+        self.assertNotModified(self.profile_url, etag)
+        AuthorFollowerService.follow(author_id=3, follower_id=2)
+        self.assertNotModified(self.profile_url, etag, not_modified=False)
+        etag = self.get_etag(self.profile_url)
+        LikeService.toggle(post_id=6, user_id=2)
+        self.assertNotModified(self.profile_url, etag, not_modified=False)
+        etag = self.get_etag(self.profile_url)
+        LikeService.toggle(post_id=1, user_id=1)
+        self.assertNotModified(self.profile_url, etag, not_modified=False)
+
+    def test_like_fragment_keyed_on_post_version(self):
+        etag = self.get_etag(self.like_url)
+        self.assertNotModified(self.like_url, etag)
+        LikeService.toggle(post_id=6, user_id=2)
+        self.assertNotModified(self.like_url, etag, not_modified=False)
+        etag = self.get_etag(self.like_url)
+        self.client.login(**second_user_credentials)
+        self.assertNotModified(self.like_url, etag, not_modified=False)
+        self.assertEqual(self.client.get(reverse('like') + '?post_id=x').status_code, 400)
+        self.assertEqual(self.client.get(reverse('like') + '?post_id=999').status_code, 404)
+
+    @override_settings(ROOT_URLCONF=ASGI_URLCONF, MIDDLEWARE=ASGI_MIDDLEWARE)
+    def test_async_feed_and_profile(self):
+        self.async_client.login(**first_user_credentials)
+
+        async def request(url: str, etag: str = ''):
+            return await self.async_client.get(url, headers={'If-None-Match': etag})
+
+        for url in (self.feed_url, self.profile_url):
+            async_to_sync(request)(url)
+            etag = async_to_sync(request)(url)['ETag']
+            self.assertEqual(async_to_sync(request)(url, etag).status_code, 304)
+            self.assertEqual(async_to_sync(request)(url, '"stale"').status_code, 200)
+
+
+class TestEvents(TestCase):
+
+    def like_event(self, post_id: int, like_count: int) -> dict:
+        return {'type': LIKE, 'post_id': post_id, 'delta': 1, 'like_count': like_count}
+
+    async def test_events_coalesced_per_subscription(self):
+        broker = EventBroker()
+        subscription = broker.subscribe([get_post_channel(1), get_author_channel(2)])
+        for like_count in (1, 2, 3):
+            broker.publish(get_post_channel(1), self.like_event(post_id=1, like_count=like_count))
+        broker.publish(get_post_channel(5), self.like_event(post_id=5, like_count=1))
+        broker.publish(get_author_channel(2), {'type': NEW_POSTS, 'post_id': 7})
+        broker.publish(get_author_channel(2), {'type': NEW_POSTS, 'post_id': 8})
+
+        self.assertEqual(await subscription.get(timeout=1), [
+            {'type': LIKE, 'post_id': 1, 'delta': 3, 'like_count': 3},
+            {'type': NEW_POSTS, 'count': 2, 'post_id': 8},
+        ])
+        self.assertEqual(await subscription.get(timeout=0.01), [])
+        subscription.close()
+        self.assertEqual(broker.subscriptions, {})
+
+    async def test_relay_broker(self):
+        server = await start_relay('127.0.0.1', 0)
+        address = '127.0.0.1:%d' % server.sockets[0].getsockname()[1]
+        publisher, subscriber = RelayBroker(address), RelayBroker(address)
+        subscription = subscriber.subscribe([get_post_channel(1)])
+        try:
+            for _ in range(50):
+                publisher.publish(get_post_channel(1), self.like_event(post_id=1, like_count=4))
+                events = await subscription.get(timeout=0.1)
+                if events:
+                    break
+            self.assertEqual([(event['post_id'], event['like_count']) for event in events], [(1, 4)])
+        finally:
+            subscription.close()
+            for listener in subscriber.listeners.values():
+                listener.cancel()
+            await asyncio.gather(*subscriber.listeners.values(), return_exceptions=True)
+            publisher.connection.close()
+            await asyncio.sleep(0.1)
+            server.close()
+            await server.wait_closed()
+
+    @override_settings(EVENT_RELAY_DRAIN_SECONDS=0.1, EVENT_RELAY_BUFFER_BYTES=64 * 1024)
+    async def test_relay_skips_sender_and_drops_slow_peers(self):
+        server = await start_relay('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        (sender_reader, sender), (slow_reader, slow), (reader, listener) = [
+            await asyncio.open_connection('127.0.0.1', port) for _ in range(3)]
+        line = b'x' * 60000 + b'\n'
+        lines = 200
+
+        async def read_all(stream: asyncio.StreamReader) -> int:
+            received = 0
+            while await stream.readline():
+                received += 1
+                if received == lines:
+                    break
+            return received
+
+        try:
+            reading = asyncio.ensure_future(read_all(reader))
+            for _ in range(lines):
+                sender.write(line)
+                await sender.drain()
+            self.assertEqual(await asyncio.wait_for(reading, 10), lines)
+            self.assertLess(await asyncio.wait_for(read_all(slow_reader), 10), lines)
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(sender_reader.readline(), 0.1)
+        finally:
+            for writer in (sender, slow, listener):
+                writer.close()
+            await asyncio.sleep(0.1)
+            server.close()
+            await server.wait_closed()
+
+    async def test_relay_publish_does_not_wait_for_relay(self):
+        broker = RelayBroker('127.0.0.1:1')
+        subscription = broker.subscribe([get_post_channel(1)])
+        connecting = Event()
+
+        def create_connection(*args, **kwargs):
+            connecting.wait(timeout=5)
+            raise OSError
+
+        try:
+            with patch('feed.events.socket.create_connection', side_effect=create_connection):
+                broker.publish(get_post_channel(1), self.like_event(post_id=1, like_count=4))
+                self.assertEqual(await subscription.get(timeout=0.01), [])
+                connecting.set()
+                events = await subscription.get(timeout=5)
+            self.assertEqual([(event['post_id'], event['like_count']) for event in events], [(1, 4)])
+        finally:
+            subscription.close()
+            for listener in broker.listeners.values():
+                listener.cancel()
+            await asyncio.gather(*broker.listeners.values(), return_exceptions=True)
+
+    def test_like_and_post_published_after_commit(self):
+        with patch('feed.services.get_broker') as get_broker, self.captureOnCommitCallbacks(execute=True):
+            liked, like_count = LikeService.toggle(post_id=6, user_id=1)
+            post = PostService.create_post(user_id=1, body='live', tags=[])
+        get_broker.return_value.publish.assert_any_call(
+            get_post_channel(6), {'type': LIKE, 'post_id': 6, 'delta': -1 if not liked else 1, 'like_count': like_count})
+        get_broker.return_value.publish.assert_any_call(get_author_channel(1), {'type': NEW_POSTS, 'post_id': post.pk})
+
+    @override_settings(EVENT_STREAM_SECONDS=0.05, EVENT_KEEPALIVE_SECONDS=0.01)
+    async def test_event_stream_ends_and_unsubscribes(self):
+        broker = EventBroker()
+        chunks = [chunk async for chunk in AsyncEvents.stream(broker.subscribe([get_post_channel(1)]))]
+        self.assertTrue(chunks[0].startswith('retry: '))
+        self.assertEqual(set(chunks[1:]), {': keepalive\n\n'})
+        self.assertEqual(broker.subscriptions, {})
+
+    @override_settings(EVENT_COALESCE_SECONDS=0, ROOT_URLCONF=ASGI_URLCONF, MIDDLEWARE=ASGI_MIDDLEWARE)
+    def test_event_stream(self):
+        self.async_client.login(**first_user_credentials)
+
+        async def read_stream():
+            response = await self.async_client.get(reverse('events'), {'posts': '6,x', 'timeline': '1'})
+            chunks = response.streaming_content
+            first = await chunks.__anext__()
+            EventService.publish_like(post_id=6, delta=1, like_count=4)
+            EventService.publish_post(post_id=100, author_id=3)
+            EventService.publish_post(post_id=101, author_id=4)
+            second = await chunks.__anext__()
+            await chunks.aclose()
+            return response, first, second
+
+        response, first, second = async_to_sync(read_stream)()
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(first, b'retry: 1000\n: connected\n\n')
+        self.assertEqual(second, b'event: like\ndata: {"type": "like", "post_id": 6, "delta": 1, "like_count": 4}\n\n'
+                                 b'event: new_posts\ndata: {"type": "new_posts", "count": 1, "post_id": 100}\n\n')
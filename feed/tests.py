@@ -1,6 +1,13 @@
 import json
+from io import StringIO
+from unittest.mock import patch
 from django.shortcuts import reverse
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from feed.models import Timeline, Post
+from feed.services import AuthorFollowerService, LikeService, PostService, SearchService
 from djangogramm.test_helpers import (create_mock_image, create_test_user, create_test_post, first_user_credentials,
                                       second_user_credentials, third_user_credentials, allowed_image_file_size,
                                       not_allowed_image_file_size)
@@ -155,6 +162,88 @@ class TestFeed(TestCase):
         self.assertContains(response, "More Iceland!!")
         self.assertNotContains(response, "i love painting...")
 
+    def test_feed_cursor_pagination(self):
+        first_page = self.client.get(self.feed_url)
+        self.assertContains(first_page, "Poland!")
+        self.assertNotContains(first_page, "Iceland, Reykjavik!")
+        self.assertNotContains(first_page, "previous")
+        next_cursor = first_page.context['page_obj'].next_cursor
+        self.assertContains(first_page, f"?cursor={next_cursor}")
+
+        second_page = self.client.get(self.feed_url, {'cursor': next_cursor})
+        self.assertContains(second_page, "Iceland, Reykjavik!")
+        self.assertContains(second_page, "My flowers!")
+        self.assertNotContains(second_page, "Poland!")
+        self.assertFalse(second_page.context['page_obj'].has_next())
+
+        previous_cursor = second_page.context['page_obj'].previous_cursor
+        previous_page = self.client.get(self.feed_url, {'cursor': previous_cursor})
+        self.assertEqual([p.pk for p in previous_page.context['page_obj']],
+                         [p.pk for p in first_page.context['page_obj']])
+
+    def test_feed_liked_post_ids(self):
+        self.client.login(**first_user_credentials)
+        response = self.client.get(self.feed_url)
+        liked_bodies = {p.body for p in response.context['page_obj'] if p.pk in response.context['liked_post_ids']}
+        self.assertEqual(liked_bodies, {"Poland!", "Italy!", "i love painting..."})
+
+    def test_feed_invalid_cursor_shows_first_page(self):
+        response = self.client.get(self.feed_url, {'cursor': 'not-a-cursor'})
+        self.assertContains(response, "Poland!")
+
+
+class TestTagFeed(TestCase):
+
+    def test_tag_posts_newest_first(self):
+        response = self.client.get(reverse('tag', kwargs={'tag': 'traveling'}))
+        self.assertTemplateUsed(response, 'feed/tag.html')
+        self.assertEqual([p.body for p in response.context['page_obj']], ["Poland!", "Italy!", "Italian food..."])
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_unknown_tag_not_found(self):
+        response = self.client.get(reverse('tag', kwargs={'tag': 'unknown'}))
+        self.assertEqual(response.status_code, 404)
+
+
+class TestSearch(TestCase):
+
+    def search(self, query: str, **kwargs) -> list:
+        return [p.body for p in SearchService.search(query, **kwargs)]
+
+    def test_search_body_and_tags(self):
+        response = self.client.get(reverse('search'), {'q': 'iceland'})
+        self.assertTemplateUsed(response, 'feed/search.html')
+        self.assertEqual({p.body for p in response.context['page_obj']}, {"Iceland, Reykjavik!", "More Iceland!!"})
+        self.assertEqual(self.search('#morskieoko'), ["Poland!"])
+        self.assertEqual(self.search('"'), [])
+
+    def test_index_follows_create_edit_and_delete(self):
+        post = PostService.create_post(user_id=1, body='Tatra mountains', tags=['#hiking'])
+        self.assertEqual(self.search('hiking'), ['Tatra mountains'])
+        Post.objects.filter(pk=post.pk).update(body='Alps')
+        self.assertEqual(self.search('tatra'), [])
+        self.assertEqual(self.search('alps'), ['Alps'])
+        Post.objects.filter(pk=post.pk).delete()
+        self.assertEqual(self.search('alps'), [])
+
+    def test_search_pagination(self):
+        first_page = SearchService.search('traveling', per_page=2)
+        self.assertEqual(len(first_page), 2)
+        second_page = SearchService.search('traveling', cursor=first_page.next_cursor, per_page=2)
+        self.assertEqual(len(second_page), 1)
+        self.assertFalse(second_page.has_next())
+        previous_page = SearchService.search('traveling', cursor=second_page.previous_cursor, per_page=2)
+        self.assertEqual([p.pk for p in previous_page], [p.pk for p in first_page])
+
+    def test_rebuild_search_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM feed_post_search')
+        self.assertEqual(self.search('poland'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=3, stdout=out)
+        self.assertIn('8 posts indexed', out.getvalue())
+        self.assertEqual(self.search('poland'), ["Poland!"])
+
 
 class TestProfileLikeFollow(TestCase):
 
@@ -267,6 +356,13 @@ class TestProfileLikeFollow(TestCase):
         response = self.client.post(f'/like/{1}', follow=True)
         self.assertEqual(response.status_code, 404)
 
+    def test_like_missing_post_error(self):
+        self.client.login(**first_user_credentials)
+        response = self.client.post(self.like_url, data={"post_id": 1000})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(self.like_url, data={"post_id": "abc"})
+        self.assertEqual(response.status_code, 400)
+
     def test_like_unlike(self):
         self.client.login(**first_user_credentials)
         new_post = create_test_post(user_id=self.new_user_id, body="new post for new user",
@@ -279,9 +375,8 @@ class TestProfileLikeFollow(TestCase):
         self.assertContains(new_user_post_not_liked, "<img src=\"/static/images/not_liked.png\">")
 
         like_ajax_response = self.client.post(self.like_url, data={"post_id": new_post.pk}, follow=True)
-        self.assertTemplateUsed(like_ajax_response, 'ajax_likes.html')
-        self.assertContains(like_ajax_response, "1 like")
-        self.assertContains(like_ajax_response, "<img src=\"/static/images/liked.png\">")
+        self.assertEqual(json.loads(like_ajax_response.content),
+                         {'post_id': new_post.pk, 'liked': True, 'like_count': 1})
 
         new_user_post_liked = self.client.get(self.new_user_profile_url)
         self.assertTemplateUsed(new_user_post_liked, 'feed/profile.html')
@@ -291,9 +386,8 @@ class TestProfileLikeFollow(TestCase):
         self.assertContains(new_user_post_liked, "<img src=\"/static/images/liked.png\">")
 
         unlike_ajax_response = self.client.post(self.like_url, data={"post_id": new_post.pk}, follow=True)
-        self.assertTemplateUsed(unlike_ajax_response, 'ajax_likes.html')
-        self.assertContains(unlike_ajax_response, "0 likes")
-        self.assertContains(unlike_ajax_response, "<img src=\"/static/images/not_liked.png\">")
+        self.assertEqual(json.loads(unlike_ajax_response.content),
+                         {'post_id': new_post.pk, 'liked': False, 'like_count': 0})
 
         new_user_post_not_liked_again = self.client.get(self.new_user_profile_url)
         self.assertTemplateUsed(new_user_post_not_liked_again, 'feed/profile.html')
@@ -301,3 +395,65 @@ class TestProfileLikeFollow(TestCase):
                                       "<div class=\"profile-card__2-col__stats__posts__value\"> 1")
         self.assertContains(new_user_post_not_liked_again, "0 likes")
         self.assertContains(new_user_post_not_liked_again, "<img src=\"/static/images/not_liked.png\">")
+
+
+class TestTimeline(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.feed_url = reverse('feed')
+
+    def test_follow_backfills_and_unfollow_prunes_timeline(self):
+        self.client.login(**second_user_credentials)
+        self.assertNotContains(self.client.get(self.feed_url), "i love painting...")
+
+        AuthorFollowerService.follow(author_id=3, follower_id=2)
+        self.assertContains(self.client.get(self.feed_url), "i love painting...")
+
+        AuthorFollowerService.unfollow(author_id=3, follower_id=2)
+        self.assertNotContains(self.client.get(self.feed_url), "i love painting...")
+        self.assertFalse(Timeline.objects.filter(user_id=2, post__user_id=3).exists())
+
+    def test_new_post_fanned_out_to_followers(self):
+        post = create_test_post(user_id=3, body="fresh painting", target_file_size=allowed_image_file_size)
+        self.assertEqual(set(Timeline.objects.filter(post=post).values_list('user_id', flat=True)), {1, 3})
+
+    @patch('feed.services.TIMELINE_FANOUT_MAX_FOLLOWERS', 1)
+    def test_popular_author_pulled_at_read(self):
+        AuthorFollowerService.follow(author_id=3, follower_id=2)
+        post = create_test_post(user_id=3, body="fresh painting", target_file_size=allowed_image_file_size)
+        self.assertEqual(list(Timeline.objects.filter(post=post).values_list('user_id', flat=True)), [3])
+
+        self.client.login(**first_user_credentials)
+        self.assertContains(self.client.get(self.feed_url), "fresh painting")
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestPostCardCache(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.feed_url = reverse('feed')
+        cache.clear()
+
+    def test_post_card_fragment_keyed_by_version(self):
+        self.assertContains(self.client.get(self.feed_url), "Poland!")
+
+        Post.objects.filter(body="Poland!").update(body="Poland, edited")
+        self.assertContains(self.client.get(self.feed_url), "Poland!")
+
+        post = Post.objects.get(body="Poland, edited")
+        LikeService.like(post_id=post.pk, user_id=2)
+        response = self.client.get(self.feed_url)
+        self.assertContains(response, "Poland, edited")
+        self.assertContains(response, "3 likes")
+
+    def test_liked_icon_not_cached(self):
+        post = Post.objects.get(body="Poland!")
+        self.client.login(**first_user_credentials)
+        self.assertContains(self.client.get(self.feed_url), f"value=\"{post.pk}\">\n                    \n"
+                                                            "                        <img src=\"/static/images/liked.png\">")
+        self.client.logout()
+        self.client.login(**second_user_credentials)
+        self.assertContains(self.client.get(self.feed_url), f"value=\"{post.pk}\">\n                    \n"
+                                                            "                        <img src=\"/static/images/not_liked.png\">")
@@ -1,12 +1,18 @@
 from django.urls import path
 from django.contrib.auth.decorators import login_required
-from feed.views import Feed, Profile, CreatePost, Like, Follow, AWSLambdaWebhook
+from feed.views import (Feed, TagFeed, Search, Profile, CreatePost, Like, Follow, AWSLambdaWebhook,
+                        FeedApi, ProfileApi, PostApi)
 
 urlpatterns = [
     path('', Feed.as_view(), name="feed"),
+    path('tags/<str:tag>/', TagFeed.as_view(), name="tag"),
+    path('search/', Search.as_view(), name="search"),
     path('profile/<int:user_id>', login_required(Profile.as_view()), name="profile"),
     path('create_post/', login_required(CreatePost.as_view()), name="create_post"),
     path('like/', login_required(Like.as_view()), name="like"),
     path('follow/', login_required(Follow.as_view()), name="follow"),
     path('webhook/', AWSLambdaWebhook.as_view(), name="webhook"),
+    path('api/feed', FeedApi.as_view(), name="api_feed"),
+    path('api/profile/<int:user_id>', ProfileApi.as_view(), name="api_profile"),
+    path('api/posts/<int:post_id>', PostApi.as_view(), name="api_post"),
 ]
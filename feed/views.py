@@ -1,50 +1,123 @@
 import json
+from typing import Optional
 from django.shortcuts import render, redirect
 from django.views import View
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 from django.utils.decorators import method_decorator
-from django.http import JsonResponse
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import JsonResponse, Http404
 from django.template.loader import render_to_string
-from feed.services import PostService, LikeService, ImageService, AuthorFollowerService
+from feed.services import (PostService, LikeService, AuthorFollowerService, SearchService, ThumbnailService,
+                           ApiService, VersionService)
 from feed.forms import PostForm, ImageFormSet
-from feed.helpers import get_page_obj, get_paginator
-from feed.models import Post
+from feed.helpers import get_cursor_page, make_etag
+from feed.models import Post, Tag
 from users.services import UserService
-from djangogramm.settings import AWS_WEBHOOK_TOKEN
+from djangogramm.settings import AWS_WEBHOOK_TOKEN, THUMBNAIL_WEBHOOK_BATCH_SIZE
+
+
+def get_feed_state(request) -> dict:
+    if not hasattr(request, 'feed_state'):
+        request.feed_state = VersionService.get_feed_state(viewer_id=request.user.pk, cursor=request.GET.get('cursor'))
+    return request.feed_state
+
+
+def get_profile_state(request, user_id: int) -> dict:
+    if not hasattr(request, 'profile_state'):
+        request.profile_state = VersionService.get_profile_state(user_id=user_id, viewer_id=request.user.pk,
+                                                                 cursor=request.GET.get('cursor'))
+    return request.profile_state
+
+
+def get_feed_etag(request) -> str:
+    return make_etag(get_feed_state(request)['validator'], request.GET.get('cursor'), request.META.get('CSRF_COOKIE'))
+
+
+def get_profile_etag(request, user_id: int) -> str:
+    return make_etag(get_profile_state(request, user_id)['validator'], request.GET.get('cursor'),
+                     request.META.get('CSRF_COOKIE'))
+
+
+def get_like_etag(request) -> Optional[str]:
+    post_id = request.GET.get('post_id', '')
+    validator = VersionService.get_like_validator(post_id=int(post_id), viewer_id=request.user.pk) \
+        if post_id.isdigit() else None
+    return make_etag(validator, request.META.get('CSRF_COOKIE')) if validator else None
+
+
+REVALIDATE = cache_control(private=True, no_cache=True)
 
 
 class Feed(View):
+    @method_decorator([REVALIDATE, condition(etag_func=get_feed_etag)])
     def get(self, request):
-        if request.user.is_authenticated:
-            posts = PostService.get_feed_posts(request.user.pk)
-            page_obj = get_page_obj(posts=posts, page_number=request.GET.get('page'))
-        else:
-            posts = PostService.get_all_posts()
-            page_obj = get_page_obj(posts=posts, page_number=request.GET.get('page'))
-        context = {'page_obj': page_obj}
+        state = get_feed_state(request)
+        page_obj = PostService.load_page(state['page'])
+        context = {
+            'page_obj': page_obj,
+            'liked_post_ids': LikeService.get_liked_post_ids(user_id=request.user.pk, posts=page_obj),
+            'trending_tags': state['trending']
+                   }
         return render(request, 'feed/feed.html', context=context)
 
 
+class TagFeed(View):
+    def get(self, request, tag):
+        try:
+            posts = PostService.get_tag_posts(f'#{tag}')
+        except Tag.DoesNotExist:
+            raise Http404
+        page_obj = get_cursor_page(posts=posts, cursor=request.GET.get('cursor'),
+                                   created_field='tag_created', id_field='tag_post_id')
+        context = {
+            'page_obj': page_obj,
+            'tag': f'#{tag}',
+            'liked_post_ids': LikeService.get_liked_post_ids(user_id=request.user.pk, posts=page_obj)
+                   }
+        return render(request, 'feed/tag.html', context=context)
+
+
+class Search(View):
+    def get(self, request):
+        query = request.GET.get('q', '').strip()
+        page_obj = SearchService.search(query=query, cursor=request.GET.get('cursor'))
+        context = {
+            'page_obj': page_obj,
+            'query': query,
+            'liked_post_ids': LikeService.get_liked_post_ids(user_id=request.user.pk, posts=page_obj)
+                   }
+        return render(request, 'feed/search.html', context=context)
+
+
 class Like(View):
 
+    @method_decorator([REVALIDATE, condition(etag_func=get_like_etag)])
     def get(self, request):
-        p = PostService.get_post_with_likes(6)
-        context = {'p': p}
+        try:
+            p = PostService.get_post_with_likes(int(request.GET['post_id']))
+        except (KeyError, ValueError):
+            return JsonResponse(status=400, data={'message': "Post id is invalid"})
+        except Post.DoesNotExist:
+            raise Http404("Post was not found")
+        context = {'p': p, 'liked_post_ids': LikeService.get_liked_post_ids(user_id=request.user.pk, posts=[p])}
         return render(request, 'ajax_likes.html', context)
 
     def post(self, request):
-        user_id = request.user.pk
-        post_id = request.POST['post_id']
-        if LikeService.check_like(user_id=user_id, post_id=post_id):
-            LikeService.unlike(user_id=user_id, post_id=post_id)
-        else:
-            LikeService.like(user_id=user_id, post_id=post_id)
-        post = PostService.get_post_with_likes(post_id)
-        context = {'p': post}
-        return render(request, 'ajax_likes.html', context)
+        try:
+            post_id = int(request.POST['post_id'])
+        except (KeyError, ValueError):
+            return JsonResponse(status=400, data={'message': "Post id is invalid"})
+        try:
+            liked, like_count = LikeService.toggle(post_id=post_id, user_id=request.user.pk)
+        except Post.DoesNotExist:
+            raise Http404("Post was not found")
+        return JsonResponse({'post_id': post_id, 'liked': liked, 'like_count': like_count})
 
 
 class Profile(View):
+    @method_decorator([REVALIDATE, condition(etag_func=get_profile_etag)])
     def get(self, request, user_id):
         stats = AuthorFollowerService.get_all_stats(author_id=user_id, follower_id=request.user.pk)
         followers_data = {
@@ -52,23 +125,14 @@ class Profile(View):
                 'followees': stats['followees'],
                 'is_following': stats['is_following']
                        }
-        if Post.objects.filter(user_id=user_id).exists():
-            posts = PostService.get_profile_posts(user_id)
-            p = get_paginator(posts=posts)
-            page_obj = p.get_page(request.GET.get('page'))
-            context = {
-                'page_obj': page_obj,
-                'author_id': user_id,
-                'posts_amount': p.count
-                       }
-            return render(request, 'feed/profile.html', context=context | followers_data)
-        else:
-            context = {
-                'page_obj': UserService.get(user_id=user_id),
-                'author_id': user_id,
-                'posts_amount': 0
-                       }
-            return render(request, 'feed/profile.html', context=context | followers_data)
+        page_obj = PostService.load_page(get_profile_state(request, user_id)['page'])
+        context = {
+            'page_obj': page_obj if page_obj else UserService.get(user_id=user_id),
+            'author_id': user_id,
+            'posts_amount': stats['posts'],
+            'liked_post_ids': LikeService.get_liked_post_ids(user_id=request.user.pk, posts=page_obj)
+                   }
+        return render(request, 'feed/profile.html', context=context | followers_data)
 
 
 class CreatePost(View):
@@ -82,13 +146,12 @@ class CreatePost(View):
         post_form = PostForm(request.POST)
         image_formset = ImageFormSet(request.POST, files=request.FILES)
         if post_form.is_valid() and image_formset.is_valid():
-            post = PostService.create_post(
+            PostService.create_post(
                 user_id=request.user.pk,
                 body=post_form.cleaned_data['body'],
-                tags=post_form.cleaned_data['tags']
+                tags=post_form.cleaned_data['tags'],
+                images=list(request.FILES.values())
             )
-            for _, image in request.FILES.items():
-                ImageService.add(image=image, post=post)
             return redirect('feed')
         return render(request, 'feed/create_post.html', context={"post_form": post_form,
                                                                  "image_formset": image_formset})
@@ -120,12 +183,53 @@ class Follow(View):
                       {'message': "Error occured. Following your own profile is not allowed"})
 
 
+def api_response(data: dict, status: int = 200) -> JsonResponse:
+    return JsonResponse(data, status=status, json_dumps_params={'separators': (',', ':')})
+
+
+class FeedApi(View):
+    def get(self, request):
+        return api_response(ApiService.get_feed(viewer_id=request.user.pk, cursor=request.GET.get('cursor')))
+
+
+class ProfileApi(View):
+    def get(self, request, user_id):
+        if not request.user.is_authenticated:
+            return api_response({'message': "Authentication required"}, status=401)
+        try:
+            data = ApiService.get_profile(user_id=user_id, viewer_id=request.user.pk, cursor=request.GET.get('cursor'))
+        except ObjectDoesNotExist:
+            return api_response({'message': "User was not found"}, status=404)
+        return api_response(data)
+
+
+class PostApi(View):
+    def get(self, request, post_id):
+        try:
+            data = ApiService.get_post(post_id=post_id, viewer_id=request.user.pk)
+        except Post.DoesNotExist:
+            return api_response({'message': "Post was not found"}, status=404)
+        return api_response(data)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class AWSLambdaWebhook(View):
+    @staticmethod
+    def is_valid_operation(operation) -> bool:
+        return (isinstance(operation, dict) and isinstance(operation.get('original'), str)
+                and isinstance(operation.get('thumbnail'), (str, type(None))))
+
     def post(self, request):
         data = json.loads(request.body)
         token = data.get('token')
         if token == AWS_WEBHOOK_TOKEN:
+            operations = data.get('make_thumbnails')
+            if operations is not None:
+                if (not isinstance(operations, list) or len(operations) > THUMBNAIL_WEBHOOK_BATCH_SIZE
+                        or not all(self.is_valid_operation(operation) for operation in operations)):
+                    return JsonResponse(status=400, data={'message': "Operations are invalid"})
+                return JsonResponse(status=200, data={'results': ThumbnailService.apply_thumbnails(operations)})
+
             make_thumbnail_data = data.get('make_thumbnail')
             if make_thumbnail_data:
 
@@ -135,12 +239,9 @@ class AWSLambdaWebhook(View):
                 if thumbnail is None or thumbnail == "":
                     return JsonResponse(status=400, data={'message': "Thumbnail cannot be emtpy"})
 
-                if "avatars" in original:
-                    instances = UserService.update_avatar(current_path=original, new_path=thumbnail)
-                else:
-                    instances = ImageService.update(current_path=original, new_path=thumbnail)
+                result = ThumbnailService.apply_thumbnails([{'original': original, 'thumbnail': thumbnail}])[0]
 
-                if instances == 0:
+                if result['status'] == 'not_found':
                     return JsonResponse(status=400, data={'message': "Image was not found"})
 
                 return JsonResponse(status=200, data={'message': 'make_thumbnail operation has been completed'})
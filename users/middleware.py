@@ -0,0 +1,40 @@
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import SESSION_KEY, HASH_SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+from users.services import UserService
+
+
+def load_user(request):
+    user_id, session_hash = request.session.get(SESSION_KEY), request.session.get(HASH_SESSION_KEY)
+    if user_id is None or session_hash is None:
+        return auth.get_user(request)
+    cache_key = UserService.get_cache_key(user_id)
+    cached = cache.get(cache_key)
+    if cached is not None and cached[0] == session_hash:
+        return cached[1]
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(cache_key, (session_hash, user), settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+def get_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = load_user(request)
+    return request._cached_user
+
+
+async def aget_user(request):
+    return await sync_to_async(get_user)(request)
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
+        request.auser = partial(aget_user, request)
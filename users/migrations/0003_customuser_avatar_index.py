@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_create_users'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='avatar',
+            field=models.ImageField(blank=True, db_index=True, upload_to='avatars/'),
+        ),
+    ]
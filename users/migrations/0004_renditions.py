@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_customuser_avatar_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
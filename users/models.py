@@ -1,4 +1,4 @@
-from django.db.models import EmailField, CharField, TextField, ImageField, BooleanField, DateTimeField
+from django.db.models import EmailField, CharField, TextField, ImageField, BooleanField, DateTimeField, JSONField
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 
 
@@ -31,7 +31,8 @@ class CustomUser(AbstractUser):
     email = EmailField(max_length=50, unique=True)
     activation_link = CharField(max_length=36, unique=True)
     bio = TextField(max_length=250, blank=True)
-    avatar = ImageField(upload_to="avatars/", blank=True)
+    avatar = ImageField(upload_to="avatars/", blank=True, db_index=True)
+    renditions = JSONField(default=dict, blank=True)
     is_active = BooleanField(default=False)
     password_reset_link = CharField(max_length=36, null=True, unique=True)
     date_password_reset_link = DateTimeField(null=True)
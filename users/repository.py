@@ -1,5 +1,10 @@
+from collections import Counter
 from datetime import datetime
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, When, Value, CharField
+from django.db.models.query import QuerySet
 
 User = get_user_model()
 
@@ -14,6 +19,10 @@ class UserRepository:
     def get(user_id: int) -> User:
         return User.objects.get(pk=user_id)
 
+    @staticmethod
+    def get_values(user_id: int) -> dict:
+        return User.objects.values('id', 'first_name', 'last_name', 'bio', 'avatar').get(pk=user_id)
+
     @staticmethod
     def get_id(user: User) -> int:
         return user.pk
@@ -41,6 +50,15 @@ class UserRepository:
     def get_by_activation_link(activation_link: str) -> User:
         return User.objects.get(activation_link=activation_link)
 
+    @staticmethod
+    def get_cache_key(user_id) -> str:
+        return f'user:{user_id}'
+
+    @staticmethod
+    def forget_cached(user_ids: list) -> None:
+        cache_keys = [UserRepository.get_cache_key(user_id) for user_id in user_ids]
+        transaction.on_commit(lambda: cache.delete_many(cache_keys), robust=True)
+
     @staticmethod
     def save(user: User) -> None:
         user.save()
@@ -59,8 +77,34 @@ class UserRepository:
         User.objects.filter(activation_link=activation_link).delete()
 
     @staticmethod
-    def update_avatar(current_path: str, new_path: str) -> None:
-        return User.objects.filter(avatar=current_path).update(avatar=new_path)
+    def get_avatar_storage():
+        return User._meta.get_field('avatar').storage
+
+    @staticmethod
+    def get_without_renditions(regenerate: bool = False) -> QuerySet:
+        users = User.objects.exclude(avatar='')
+        return users if regenerate else users.filter(renditions={})
+
+    @staticmethod
+    def get_avatar_paths(user_ids: list) -> list:
+        return list(User.objects.filter(id__in=user_ids).exclude(avatar='').values_list('id', 'avatar'))
+
+    @staticmethod
+    def set_renditions(renditions: dict) -> None:
+        User.objects.bulk_update([User(id=user_id, renditions=value) for user_id, value in renditions.items()],
+                                 fields=['renditions'])
+        UserRepository.forget_cached(list(renditions))
+
+    @staticmethod
+    def update_avatars(paths: dict) -> dict:
+        users = list(User.objects.filter(avatar__in=paths).values_list('id', 'avatar'))
+        found = Counter(avatar for _, avatar in users)
+        if found:
+            User.objects.filter(avatar__in=found).update(avatar=Case(
+                *[When(avatar=current_path, then=Value(paths[current_path])) for current_path in found],
+                output_field=CharField()))
+            UserRepository.forget_cached([user_id for user_id, _ in users])
+        return found
 
     @staticmethod
     def get_by_email(email: str) -> User:
@@ -2,10 +2,13 @@ from uuid import uuid4
 from datetime import datetime, timedelta, timezone
 from django.conf import settings
 from django.core.mail import send_mail
+from django.db import transaction
 from django.template.loader import render_to_string
 from django.contrib.auth import get_user_model
 from users.repository import UserRepository
-from djangogramm.settings import ACTIVATION_LINK_LIFETIME_IN_WEEKS, PASSWORD_RESET_LINK_LIFETIME_IN_WEEKS
+from feed.services import ThumbnailService, VersionService
+from djangogramm.settings import (ACTIVATION_LINK_LIFETIME_IN_WEEKS, PASSWORD_RESET_LINK_LIFETIME_IN_WEEKS,
+                                  LOCAL_THUMBNAILS)
 
 
 User = get_user_model()
@@ -17,6 +20,10 @@ class UserService:
     def get(user_id: int) -> User:
         return UserRepository.get(user_id)
 
+    @staticmethod
+    def get_cache_key(user_id) -> str:
+        return UserRepository.get_cache_key(user_id)
+
     @staticmethod
     def generate_activation_link() -> str:
         activation_link = str(uuid4())
@@ -50,6 +57,10 @@ class UserService:
         user.is_active = True
         user.set_password(password1)
         UserRepository.save(user)
+        VersionService.bump_user(user.pk)
+        if LOCAL_THUMBNAILS and user.avatar:
+            transaction.on_commit(lambda: ThumbnailService.schedule_renditions(
+                ThumbnailService.make_avatar_renditions, [user.pk]), robust=True)
         return user
 
     @staticmethod
@@ -71,10 +82,6 @@ class UserService:
     def delete(activation_link: str) -> None:
         UserRepository.delete(activation_link)
 
-    @staticmethod
-    def update_avatar(current_path: str, new_path: str) -> None:
-        return UserRepository.update_avatar(current_path=current_path, new_path=new_path)
-
     @staticmethod
     def generate_password_reset_link() -> str:
         password_reset_link = str(uuid4())
@@ -0,0 +1,9 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from users.repository import UserRepository
+
+
+@receiver(post_save, sender=get_user_model())
+def forget_cached_user(sender, instance, **kwargs):
+    UserRepository.forget_cached([instance.pk])
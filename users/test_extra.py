@@ -1,9 +1,14 @@
 from datetime import timedelta
 from django.shortcuts import reverse
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.core import mail
+from django.core.cache import cache
+from django.db import connection
 from users.forms import RegistrationForm, ActivationForm
+from users.repository import UserRepository
+from users.services import UserService
 from djangogramm.test_helpers import (create_mock_image, first_user_credentials, second_user_credentials,
                                       registration_credentials, allowed_avatar_file_size, not_allowed_avatar_file_size)
 from djangogramm.settings import PASSWORD_RESET_LINK_LIFETIME_IN_WEEKS
@@ -212,3 +217,60 @@ class TestActivationForm(TestCase):
                 'password2': '8uhb5thm'
             })
             self.assertFalse(form.is_valid())
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestCachedAuthentication(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(**first_user_credentials)
+        self.user = get_user_model().objects.get(email=first_user_credentials['username'])
+        self.url = reverse('like') + '?post_id=6'
+
+    def count_queries(self) -> int:
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        return len(context.captured_queries)
+
+    def test_session_and_user_served_from_cache(self):
+        self.client.get(self.url)
+        cached = self.count_queries()
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            self.assertEqual(self.count_queries(), cached + 2)
+
+    def test_password_reset_invalidates_cached_user(self):
+        self.client.get(self.url)
+        self.assertIsNotNone(cache.get(UserService.get_cache_key(self.user.pk)))
+        with self.captureOnCommitCallbacks(execute=True):
+            UserService.reset_password(UserService.add_password_reset_link(self.user.email), 'newpassword123')
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_activation_invalidates_cached_user(self):
+        cache_key = UserService.get_cache_key(self.user.pk)
+        cache.set(cache_key, (self.user.get_session_auth_hash(), self.user))
+        with self.captureOnCommitCallbacks(execute=True):
+            UserService.activate_user(self.user.activation_link, first_name='Ada', last_name='Lovelace',
+                                      password1='newpassword123', bio='')
+        self.assertIsNone(cache.get(cache_key))
+
+    def test_user_writes_invalidate_cached_user(self):
+        cache_key = UserService.get_cache_key(self.user.pk)
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertIsNone(cache.get(cache_key))
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+        self.user.is_active = True
+        self.user.avatar = 'avatars/old.jpg'
+        self.user.save()
+        self.client.login(**first_user_credentials)
+        for update in (lambda: UserRepository.update_avatars({'avatars/old.jpg': 'avatars/new.jpg'}),
+                       lambda: UserRepository.set_renditions({self.user.pk: {'avatar_32': 'avatars/32.jpg'}})):
+            self.client.get(self.url)
+            self.assertIsNotNone(cache.get(cache_key))
+            with self.captureOnCommitCallbacks(execute=True):
+                update()
+            self.assertIsNone(cache.get(cache_key))